@@ -2,6 +2,8 @@
 
 from __future__ import annotations
 
+import re
+
 import pytest
 
 from ypack.config import (
@@ -111,6 +113,22 @@ class TestInstallerSection:
         assert 'SetOutPath "$INSTDIR"' in script
         assert 'SetOutPath "$INSTDIR\\lib"' in script
 
+    def test_group_by_destination(self):
+        """With group_by_destination, interleaved destinations share one SetOutPath."""
+        cfg = PackageConfig.from_dict({
+            "app": {"name": "T", "version": "1"},
+            "install": {"group_by_destination": True},
+            "files": [
+                {"source": "a.exe", "destination": "$INSTDIR"},
+                {"source": "b.dll", "destination": "$INSTDIR\\lib"},
+                {"source": "c.exe", "destination": "$INSTDIR"},
+            ],
+        })
+        script = YamlToNsisConverter(cfg).convert()
+        assert script.count('SetOutPath "$INSTDIR"') == 1
+        # User order preserved within a destination
+        assert script.index('File "a.exe"') < script.index('File "c.exe"')
+
     def test_shortcuts(self):
         cfg = _simple_config()
         from ypack.config import ShortcutConfig
@@ -621,9 +639,10 @@ class TestOnInit:
         assert 'Function ExistingInstall_DirLeave' in script
         assert 'IfFileExists "$R1\\Uninstall.exe"' in script
         # If the registry install path matches the selected $INSTDIR, we still
-        # require Uninstall.exe before showing version or prompting.
+        # require Uninstall.exe before showing version or prompting (the
+        # probe result is cached in $R5 rather than re-stat'ing the file).
         assert 'StrCmp $R0 "$R1" 0 _eid_done' in script
-        assert 'IfFileExists "$R1\\Uninstall.exe" _eid_has_uninst _eid_done' in script
+        assert 'StrCmp $R5 "1" _eid_has_uninst _eid_done' in script
         assert 'Call _YPACK_GetFileProductVersion' in script
 
     def test_allow_multiple_legacy_field(self):
@@ -818,3 +837,99 @@ class TestConverterRegistry:
     def test_output_extension(self):
         from ypack.converters import OUTPUT_EXTENSIONS
         assert OUTPUT_EXTENSIONS["nsis"] == ".nsi"
+
+
+# -----------------------------------------------------------------------
+# Label scope consistency
+# -----------------------------------------------------------------------
+
+# NSIS labels are scoped to their enclosing Function/Section: a jump to a
+# label that is not defined in the same scope fails at makensis time with
+# "can't resolve label", which substring assertions on the script cannot
+# catch. The helpers below scan every emitted scope and cross-check jump
+# targets against label definitions.
+
+_LABEL_DEF_RE = re.compile(r"^([A-Za-z_][\w.]*):\s*$")
+# Tokens, treating "..." (with NSIS $\" escapes) as a single unit so words
+# inside message strings are never mistaken for jump targets.
+_TOKEN_RE = re.compile(r'"(?:\$\\"|[^"])*"|\S+')
+_LABEL_RE = re.compile(r"^[A-Za-z_][\w.]*$")
+
+
+def _jump_targets(parts):
+    """Label operands of one instruction (relative jumps like +2/0 excluded)."""
+    op = parts[0]
+    if op == "Goto":
+        targets = parts[1:2]
+    elif op in ("StrCmp", "StrCmpS"):
+        targets = parts[3:5]
+    elif op in ("IntCmp", "IntCmpU"):
+        targets = parts[3:6]
+    elif op == "IfFileExists":
+        targets = parts[2:4]
+    elif op == "IfErrors":
+        targets = parts[1:3]
+    elif op == "MessageBox":
+        # IDYES/IDNO/IDRETRY/... each name the jump target that follows.
+        targets = [parts[i + 1] for i, p in enumerate(parts[:-1])
+                   if p.startswith("ID") and p.isupper()]
+    else:
+        targets = []
+    return [t for t in targets if _LABEL_RE.match(t)]
+
+
+def _label_scope_errors(script):
+    """Return 'scope: label' strings for jumps to labels missing in scope."""
+    errors = []
+    scope = None
+    defined: set = set()
+    referenced: set = set()
+    for line in script.splitlines():
+        stripped = line.strip()
+        parts = _TOKEN_RE.findall(stripped)
+        if not parts:
+            continue
+        if parts[0] in ("Function", "Section") and scope is None:
+            scope = stripped
+            defined, referenced = set(), set()
+            continue
+        if parts[0] in ("FunctionEnd", "SectionEnd") and scope is not None:
+            errors.extend(f"{scope}: {label}" for label in sorted(referenced - defined))
+            scope = None
+            continue
+        if scope is None:
+            continue
+        m = _LABEL_DEF_RE.match(stripped)
+        if m:
+            defined.add(m.group(1))
+        else:
+            referenced.update(_jump_targets(parts))
+    return errors
+
+
+class TestLabelScopes:
+    def test_default_config(self):
+        # The default existing_install handling emits the version-info
+        # helper function; this is the scope that regressed once.
+        script = YamlToNsisConverter(_simple_config()).convert()
+        assert "Function _YPACK_GetFileProductVersion" in script
+        assert _label_scope_errors(script) == []
+
+    def test_full_featured_config(self):
+        cfg = _simple_config(
+            app={"name": "T", "version": "1.0", "publisher": "P"},
+            install={
+                "shortcuts": {"desktop": True, "start_menu": True},
+                "env_vars": [{"name": "PATH", "value": "$INSTDIR\\bin", "append": True}],
+            },
+            packages={"core": {"sources": [{"source": "core.dll"}]}},
+            files=[
+                {"source": "test.exe"},
+                {"source": "https://example.com/tool.zip", "destination": "$INSTDIR",
+                 "decompress": True},
+            ],
+            logging={"enabled": True, "path": "$INSTDIR\\install.log"},
+            languages={"default": "English", "supported": ["English", "SimplifiedChinese"]},
+        )
+        script = YamlToNsisConverter(cfg).convert()
+        assert _label_scope_errors(script) == []
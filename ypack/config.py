@@ -16,6 +16,7 @@ except ImportError as e:
 
 from typing import Any, Dict, List, Optional, Union
 from dataclasses import dataclass, field
+from functools import cached_property
 
 
 # ---------------------------------------------------------------------------
@@ -50,9 +51,18 @@ class LangText:
             return cls()
         return cls(text=str(value))
 
-    def is_empty(self) -> bool:
+    @cached_property
+    def empty(self) -> bool:
+        """Whether this text carries no value at all.
+
+        Cached: emitters test this repeatedly in hot loops and LangText
+        values are not mutated after configuration parsing.
+        """
         return not self.text and not self.translations
 
+    def is_empty(self) -> bool:
+        return self.empty
+
     def get_for_language(self, lang_name: str, field_name: str) -> str:
         from .languages import resolve_language_name
 
@@ -347,6 +357,9 @@ class InstallConfig:
     # Registry view for the application key and ARP entries.
     # "64" = 64-bit view, "32" = 32-bit view, "auto" = derive from install_dir.
     registry_view: str = "auto"
+    # Group file entries by destination so each directory gets a single
+    # SetOutPath. Off by default because it reorders File directives.
+    group_by_destination: bool = False
     # Rich existing-install detection policy
     existing_install: Optional[ExistingInstallConfig] = field(default_factory=ExistingInstallConfig)
 
@@ -416,6 +429,7 @@ class InstallConfig:
             installer_name=data.get("installer_name", ""),
             registry_key=data.get("registry_key", ""),
             registry_view=data.get("registry_view", "auto"),
+            group_by_destination=bool(data.get("group_by_destination", False)),
             existing_install=ei,
         )
 
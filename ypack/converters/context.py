@@ -41,6 +41,7 @@ class BuildContext:
 
         from ..resolver import create_resolver
         self._resolver = create_resolver(self.raw_config, self.target_tool)
+        self._resolve_cache: Dict[str, str] = {}
 
     @property
     def path_separator(self) -> str:
@@ -73,10 +74,19 @@ class BuildContext:
     # ------------------------------------------------------------------
 
     def resolve(self, text: str) -> str:
-        """Resolve all variable references in *text*."""
+        """Resolve all variable references in *text*.
+
+        Results are memoised per context: the same strings (descriptions,
+        paths, message templates) are resolved many times during a single
+        emission pass, and the underlying configuration never changes
+        within a build.
+        """
         if not text or not isinstance(text, str):
             return text
-        return self._resolver.resolve(text)
+        cached = self._resolve_cache.get(text)
+        if cached is None:
+            cached = self._resolve_cache[text] = self._resolver.resolve(text)
+        return cached
 
     # ------------------------------------------------------------------
     # Path helpers
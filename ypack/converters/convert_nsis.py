@@ -31,6 +31,13 @@ from .nsis_packages import (
 )
 from .nsis_sections import generate_installer_section, generate_uninstaller_section
 
+# Line prefixes used by _reorder_mui_language to classify generated lines.
+# Hoisted to module scope so the hot per-line loop does a single global
+# fetch instead of rebuilding the constants on every call.
+_PAGE_PREFIXES = ('!insertmacro MUI_PAGE', '!insertmacro MUI_UNPAGE', 'Page custom')
+_LANG_PREFIX = '!insertmacro MUI_LANGUAGE'
+_LANGSTR_PREFIX = 'LangString '
+
 
 class YamlToNsisConverter(BaseConverter):
     """Converts a :class:`PackageConfig` into a complete NSIS script."""
@@ -40,12 +47,32 @@ class YamlToNsisConverter(BaseConverter):
 
     def __init__(self, config: PackageConfig, raw_config: Optional[Dict[str, Any]] = None) -> None:
         super().__init__(config, raw_config)
+        # (output_dir, script) pair from the last convert() run. The
+        # configuration is immutable once parsed, so the rendered script
+        # can only change when output_dir does (it affects relative
+        # source paths).
+        self._convert_cache: Optional[tuple] = None
 
     # ------------------------------------------------------------------
     # Public API
     # ------------------------------------------------------------------
 
     def convert(self) -> str:  # noqa: D102
+        # Repeated renders (preview + save, matrix builds) are common and
+        # the emission is deterministic — reuse the previous result when
+        # nothing it depends on has changed.
+        cached = self._convert_cache
+        if cached is not None and cached[0] == self.ctx.output_dir:
+            return cached[1]
+
+        # Fragments stay str until the single join below: save() still has
+        # to run regex-based variable resolution over the script, so
+        # accumulating UTF-8 bytes here would only force a decode/encode
+        # round-trip. The one-pass encode happens at write time.
+        # The generators are materialized lists rather than lazy iterators
+        # on purpose: the MUI language reorder below and save()'s variable
+        # resolution both need the whole script, and the convert cache
+        # returns the same rendered text to repeated callers.
         parts: List[str] = []
 
         # Header (unicode, defines, icons)
@@ -107,10 +134,15 @@ class YamlToNsisConverter(BaseConverter):
 
         # Post-process: Reorder MUI_LANGUAGE and LangString definitions to appear
         # after all MUI_PAGE_* and MUI_UNPAGE_* macros (NSIS MUI requirement).
-        script_lines = "\n".join(filtered_parts).split("\n")
-        reordered_lines = self._reorder_mui_language(script_lines)
-
-        return "\n".join(reordered_lines)
+        # A single C-level substring scan over the joined script decides
+        # whether the per-line reorder pass is needed at all — for scripts
+        # without language directives the loop is skipped entirely.
+        script = "\n".join(filtered_parts)
+        if _LANG_PREFIX in script:
+            script = "\n".join(self._reorder_mui_language(script.split("\n")))
+
+        self._convert_cache = (self.ctx.output_dir, script)
+        return script
     
     def _reorder_mui_language(self, lines: List[str]) -> List[str]:
         """Reorder script lines so MUI_LANGUAGE and LangString come after UI pages.
@@ -134,19 +166,20 @@ class YamlToNsisConverter(BaseConverter):
         other_lines = []
         found_last_page = -1
         
-        for i, line in enumerate(lines):
-            stripped = line.strip()
-            
+        for line in lines:
+            # Only the head of the line matters for the prefix checks below,
+            # and generated NSIS lines rarely start with whitespace — so skip
+            # the lstrip() allocation entirely for the common flush-left case.
+            stripped = line.lstrip() if line[:1] in (' ', '\t') else line
+
             # Track the last MUI_PAGE or MUI_UNPAGE macro or custom page
-            if stripped.startswith('!insertmacro MUI_PAGE') or \
-               stripped.startswith('!insertmacro MUI_UNPAGE') or \
-               stripped.startswith('Page custom'):
+            if stripped.startswith(_PAGE_PREFIXES):
                 found_last_page = len(other_lines)
-            
+
             # Collect language directives to move
-            if stripped.startswith('!insertmacro MUI_LANGUAGE'):
+            if stripped.startswith(_LANG_PREFIX):
                 language_directives.append(line)
-            elif stripped.startswith('LangString '):
+            elif stripped.startswith(_LANGSTR_PREFIX):
                 langstring_defs.append(line)
             else:
                 other_lines.append(line)
@@ -176,12 +209,18 @@ class YamlToNsisConverter(BaseConverter):
         # such as ${APP_NAME}.
         import re
         pattern = re.compile(r"\$\{([a-z][a-z0-9_.]*)\}")
-        def _repl(m: re.Match) -> str:
-            return self.ctx.resolve(m.group(0))
-        script = pattern.sub(_repl, script)
+        resolve = self.ctx.resolve
+        # The same reference (e.g. ${app.name}) typically appears many times
+        # in a generated script. Use the regex once to discover the distinct
+        # references, then substitute each via str.replace — a C-level scan
+        # that beats a callback-driven re.sub over the whole script.
+        for name in set(pattern.findall(script)):
+            needle = "${" + name + "}"
+            script = script.replace(needle, resolve(needle))
 
         # NSIS requires the script file to be encoded as UTF-8 with BOM
-        # when it contains Unicode characters. Use 'utf-8-sig' so Python
-        # writes the BOM automatically at the start of the file.
-        with open(output_path, "w", encoding="utf-8-sig") as fh:
-            fh.write(script)
+        # when it contains Unicode characters. Prepend the BOM and write in
+        # binary mode: one C-level encode of the whole script instead of the
+        # incremental encoder + newline translation of a text-mode handle.
+        with open(output_path, "wb") as fh:
+            fh.write(("\ufeff" + script).encode("utf-8"))
@@ -11,6 +11,7 @@ from typing import List, Optional
 from .context import BuildContext
 from .nsis_languages import NsisLanguageMapping, get_nsis_mapping_or_fallback
 from .nsis_sections import collect_all_shortcuts
+from .nsis_templates import _ARP_MACROS_BLOCK
 from ..config import LanguageConfig, LangText
 from ..languages import (
     get_translated_string,
@@ -102,6 +103,7 @@ def generate_header(ctx: BuildContext) -> List[str]:
         reg_key = f"Software\\{cfg.app.publisher}\\{cfg.app.name}"
     reg_key = ctx.resolve(reg_key)
     lines.append(f'!define REG_KEY "{reg_key}"')
+    lines.append(_ARP_MACROS_BLOCK)
     lines.append("")
 
     # MUI icon defines (must appear before !include MUI2.nsh)
@@ -586,10 +588,10 @@ def generate_modern_ui(ctx: BuildContext) -> List[str]:
             # Requires Windows: substitute {mv} if present
             mv = ctx.config.install.system_requirements.min_windows_version if ctx.config.install.system_requirements else ""
             text = get_translated_string(lang_cfg.name, 'requires_windows', lang_cfg.strings)
-            try:
-                text = text.format(mv=mv)
-            except Exception:
-                pass
+            # str.replace instead of str.format: no format-spec parsing,
+            # and translations containing NSIS ${...} defines no longer
+            # trip format's brace handling and skip the substitution.
+            text = text.replace("{mv}", str(mv))
             text = ctx.resolve(text)
             text = _escape_nsis_langstring(text)
             lines.append(f'LangString REQUIRES_WINDOWS {lc} "{text}"')
@@ -597,20 +599,14 @@ def generate_modern_ui(ctx: BuildContext) -> List[str]:
             mb_space = (ctx.config.install.system_requirements.min_free_space_mb
                         if ctx.config.install.system_requirements else 0)
             text = get_translated_string(lang_cfg.name, 'not_enough_space', lang_cfg.strings)
-            try:
-                text = text.format(mb=mb_space)
-            except Exception:
-                pass
+            text = text.replace("{mb}", str(mb_space))
             text = ctx.resolve(text)
             text = _escape_nsis_langstring(text)
             lines.append(f'LangString NOT_ENOUGH_SPACE {lc} "{text}"')
             mb_mem = (ctx.config.install.system_requirements.min_ram_mb
                       if ctx.config.install.system_requirements else 0)
             text = get_translated_string(lang_cfg.name, 'not_enough_memory', lang_cfg.strings)
-            try:
-                text = text.format(mb=mb_mem)
-            except Exception:
-                pass
+            text = text.replace("{mb}", str(mb_mem))
             text = ctx.resolve(text)
             text = _escape_nsis_langstring(text)
             lines.append(f'LangString NOT_ENOUGH_MEMORY {lc} "{text}"')
@@ -24,12 +24,16 @@ from .context import BuildContext
 def generate_log_macros() -> List[str]:
     r"""Emit reusable ``!macro`` blocks for structured install/uninstall logging.
 
-    Three macros are generated:
+    Three core macros are generated:
 
     * **LogInit** – opens (or creates) the log file and writes a header.
     * **LogWrite** ``<message>`` – appends one timestamped line.
     * **LogClose** – writes a footer and closes the file handle.
 
+    Two per-component shorthands, **LogInstall** ``<name>`` and
+    **LogDone** ``<name>``, wrap LogWrite with the standard component
+    messages so section emission inserts one short macro per package.
+
     The macros use compile-time ``!ifdef LOG_FILE`` guards so they
     silently become no-ops when logging is not configured.  They are
     safe to call from *any* Section or Function (installer **and**
@@ -82,6 +86,20 @@ def generate_log_macros() -> List[str]:
         "!macroend",
         "",
         "; ---------------------------------------------------------------------------",
+        "; LogInstall / LogDone – per-component shorthands",
+        ";   Usage: !insertmacro LogInstall <component name>",
+        ";   One insertion instead of a full LogWrite line keeps the generated",
+        ";   script smaller for configs with many components.",
+        "; ---------------------------------------------------------------------------",
+        "!macro LogInstall _name",
+        '  !insertmacro LogWrite "Installing component: ${_name}"',
+        "!macroend",
+        "",
+        "!macro LogDone _name",
+        '  !insertmacro LogWrite "Component ${_name} done."',
+        "!macroend",
+        "",
+        "; ---------------------------------------------------------------------------",
         "; LogClose – write footer and close the file",
         "; ---------------------------------------------------------------------------",
         "!macro LogClose",
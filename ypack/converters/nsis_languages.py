@@ -13,6 +13,7 @@ lives.  The generic ``ypack.languages`` module is framework-agnostic.
 from __future__ import annotations
 
 from dataclasses import dataclass
+from functools import lru_cache
 from typing import Dict, Optional
 
 from ..languages import resolve_language_name
@@ -101,11 +102,15 @@ _n("Macedonian",             "Macedonian",           1071)
 # Public API
 # ---------------------------------------------------------------------------
 
+@lru_cache(maxsize=None)
 def get_nsis_mapping(lang_name: str) -> Optional[NsisLanguageMapping]:
     """Look up NSIS-specific identifiers for a language.
 
     Accepts canonical ypack names **or** aliases (resolved automatically).
     Returns ``None`` if the language is not in the NSIS mapping.
+
+    The mapping table is static, so results are memoised for the life of
+    the process.
     """
     canonical = resolve_language_name(lang_name)
     return _NSIS_MAP.get(canonical)
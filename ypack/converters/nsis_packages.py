@@ -7,12 +7,28 @@ commands, and the .onInit section-flag setup.
 
 from __future__ import annotations
 
+import itertools
 import os
-from typing import List
+from functools import lru_cache
+from typing import List, Sequence
 
 from .context import BuildContext
+from .nsis_templates import (
+    _DEBUG_LOG_MACRO,
+    _DEBUG_LOG_STUB,
+    _EI_DEFERRED_NOTE,
+    _EI_HEADER_TMPL,
+    _EI_VERSION_PROBE_TMPL,
+    _EI_WAIT_INFINITE_TMPL,
+    _EI_WAIT_TIMED_TMPL,
+    _SIGNING_TMPL,
+    _UNINIT_LOG_BLOCK,
+    _UNINIT_TMPL,
+    _UPDATE_TMPL,
+    _VERINFO_FUNC,
+)
 from .nsis_languages import get_nsis_mapping
-from .nsis_sections import _normalize_path, _should_use_recursive, _flatten_packages
+from .nsis_sections import _normalize_path, _should_use_recursive, get_flat_packages
 from .nsis_sections import (
     _emit_registry_writes_for,
     _emit_env_var_writes_for,
@@ -21,6 +37,40 @@ from .nsis_sections import (
     collect_all_shortcuts,
 )
 
+# Translation table escaping double quotes for NSIS string context.
+# str.translate beats repeated str.replace for single-character rewrites.
+_NSIS_QUOTE_TABLE = str.maketrans({'"': '$\\"'})
+
+
+# Shared prefix for debug-log insertion lines emitted from Python code.
+# Keeping it in one helper avoids a dozen copies of the long literal and
+# localises any future prefix change to one spot.
+_DBG_PREFIX = '  !insertmacro _YPACK_DebugLog "[YPACK] '
+
+
+def _dbg(msg: str) -> str:
+    """Return one ``!insertmacro _YPACK_DebugLog`` line for *msg*."""
+    return ''.join((_DBG_PREFIX, msg, '"'))
+
+
+# Fixed debug-log lines for the DirLeave callback. The branches below
+# pick one of these shared tuples instead of building throwaway lists on
+# every call; ``_NO_LOG`` is the logging-disabled placeholder.
+_NO_LOG: tuple = ()
+_EID_ENTRY_LOG = (
+    _dbg('ExistingInstall_DirLeave: ENTRY user-selected INSTDIR=$INSTDIR'),
+)
+_EID_PRE_CALL_LOG = (
+    _dbg('ExistingInstall_DirLeave: entering ProductVersion branch (target=$R1\\Uninstall.exe)'),
+)
+_EID_POST_CALL_LOG = (
+    _dbg('ExistingInstall_DirLeave: ProductVersion raw result=$R2'),
+)
+_EID_FALLBACK_LOG = (
+    _dbg('ExistingInstall_DirLeave: ProductVersion empty -> fallback GetDLLVersion'),
+)
+
+
 
 def generate_package_sections(ctx: BuildContext) -> List[str]:
     """Emit ``Section`` / ``SectionGroup`` blocks for every package."""
@@ -35,52 +85,71 @@ def generate_package_sections(ctx: BuildContext) -> List[str]:
         "",
     ]
 
-    idx_ref = [0]  # mutable counter shared across recursion
-    group_idx_ref = [0]  # counter for SectionGroup IDs
+    # itertools.count increments in C — cheaper and clearer than the
+    # mutable [0]-cell pattern across the closure recursion below.
+    sec_counter = itertools.count()
+    group_counter = itertools.count()
+
+    # (pkg, sec_id, is_group) tuples collected during the emit walk so that
+    # generate_package_descriptions can reuse the exact IDs assigned here
+    # without re-walking the tree (and without any risk of the two
+    # numberings drifting apart).
+    collected: list = []
+    ctx._pkg_ids = collected
+
+    # Bind the bound methods once — the recursion below appends thousands of
+    # lines for large component trees, and method lookup per call adds up.
+    append = lines.append
+    extend = lines.extend
+
+    # has_logging is invariant for the whole build: choose the log
+    # emitters once instead of re-testing the flag at every package and
+    # post-install command.
+    if has_logging:
+        log_install = lambda name: append(f'  !insertmacro LogInstall "{name}"')  # noqa: E731
+        log_done = lambda name: append(f'  !insertmacro LogDone "{name}"')  # noqa: E731
+        log_run = lambda cmd: append(f'  !insertmacro LogWrite "Running: {cmd}"')  # noqa: E731
+    else:
+        log_install = log_done = log_run = lambda _arg: None  # noqa: E731
 
     def _emit(pkg_list: list) -> None:
         for pkg in pkg_list:
             if pkg.children:
                 # Assign ID to SectionGroup if it has a description
-                if not pkg.description.is_empty():
-                    group_id = f"SEC_GROUP_{group_idx_ref[0]}"
-                    group_idx_ref[0] += 1
-                    lines.append(f'SectionGroup /e "{pkg.name}" {group_id}')
+                if not pkg.description.empty:
+                    group_id = f"SEC_GROUP_{next(group_counter)}"
+                    collected.append((pkg, group_id, True))
+                    append(f'SectionGroup /e "{pkg.name}" {group_id}')
                 else:
-                    lines.append(f'SectionGroup "{pkg.name}"')
+                    append(f'SectionGroup "{pkg.name}"')
                 _emit(pkg.children)
-                lines.append("SectionGroupEnd")
-                lines.append("")
+                extend(("SectionGroupEnd", ""))
             else:
-                sec_name = f"SEC_PKG_{idx_ref[0]}"
-                idx_ref[0] += 1
-                lines.append(f'Section "{pkg.name}" {sec_name}')
+                sec_idx = next(sec_counter)
+                sec_name = f"SEC_PKG_{sec_idx}"
+                collected.append((pkg, sec_name, False))
+                append(f'Section "{pkg.name}" {sec_name}')
 
-                if has_logging:
-                    lines.append(f'  !insertmacro LogWrite "Installing component: {pkg.name}"')
+                log_install(pkg.name)
 
                 for src_entry in pkg.sources:
                     src_val = src_entry.get("source", "")
                     dest = src_entry.get("destination", "$INSTDIR")
-                    lines.append(f'  SetOutPath "{dest}"')
+                    append(f'  SetOutPath "{dest}"')
 
-                    if isinstance(src_val, list):
-                        for s in src_val:
-                            lines.append(_file_line(ctx, s))
-                    else:
-                        lines.append(_file_line(ctx, src_val))
+                    # Normalise to a sequence so single sources and lists
+                    # share one loop.
+                    srcs = src_val if isinstance(src_val, list) else (src_val,)
+                    extend(_file_lines(ctx, srcs))
 
                 if pkg.post_install:
-                    lines.append("")
-                    lines.append("  ; Post-install commands")
+                    extend(("", "  ; Post-install commands"))
                     for cmd in pkg.post_install:
-                        if has_logging:
-                            # Escape double quotes for NSIS string context
-                            log_msg = cmd.replace('"', '$\\"')
-                            lines.append(f'  !insertmacro LogWrite "Running: {log_msg}"')
-                        # Escape double quotes in ExecWait command
-                        exec_cmd = cmd.replace('"', '$\\"')
-                        lines.append(f'  ExecWait "{exec_cmd}"')
+                        # Escape double quotes once for both the log line
+                        # and the ExecWait command
+                        exec_cmd = cmd.translate(_NSIS_QUOTE_TABLE)
+                        log_run(exec_cmd)
+                        append(f'  ExecWait "{exec_cmd}"')
 
                 # Per-package registry entries
                 if pkg.registry_entries:
@@ -97,44 +166,15 @@ def generate_package_sections(ctx: BuildContext) -> List[str]:
 
                 # Per-package file associations
                 if pkg.file_associations:
-                    _emit_file_associations_for(ctx, lines, pkg.file_associations, f"pkg_{idx_ref[0] - 1}")
+                    _emit_file_associations_for(ctx, lines, pkg.file_associations, f"pkg_{sec_idx}")
 
-                if has_logging:
-                    lines.append(f'  !insertmacro LogWrite "Component {pkg.name} done."')
-                lines.append("SectionEnd")
-                lines.append("")
+                log_done(pkg.name)
+                extend(("SectionEnd", ""))
 
     _emit(ctx.config.packages)
     return lines
 
 
-def _collect_all_packages_with_ids(packages) -> list:
-    """Collect all packages (including groups) with their assigned IDs.
-    Returns list of tuples: (pkg, id_str, is_group)
-    """
-    result = []
-    pkg_idx = [0]
-    group_idx = [0]
-    
-    def _collect(pkg_list):
-        for pkg in pkg_list:
-            if pkg.children:
-                # SectionGroup
-                if not pkg.description.is_empty():
-                    group_id = f"SEC_GROUP_{group_idx[0]}"
-                    group_idx[0] += 1
-                    result.append((pkg, group_id, True))
-                _collect(pkg.children)
-            else:
-                # Regular Section
-                sec_id = f"SEC_PKG_{pkg_idx[0]}"
-                pkg_idx[0] += 1
-                result.append((pkg, sec_id, False))
-    
-    _collect(packages)
-    return result
-
-
 def generate_package_descriptions(ctx: BuildContext) -> List[str]:
     """Emit LangString definitions and MUI_DESCRIPTIONS_TABLE for package descriptions.
     
@@ -143,23 +183,14 @@ def generate_package_descriptions(ctx: BuildContext) -> List[str]:
     """
     if not ctx.config.packages:
         return []
-    
-    all_pkgs = _collect_all_packages_with_ids(ctx.config.packages)
-    has_descriptions = any(not pkg.description.is_empty() for pkg, _, _ in all_pkgs)
-    
-    if not has_descriptions:
-        return []
-    
-    lines: List[str] = [
-        "; ===========================================================================",
-        "; Component Descriptions (displayed in Components page)",
-        "; ===========================================================================",
-        "",
-    ]
-    
-    # Generate LangString definitions for each component/group with a description
-    desc_idx = 0
-    desc_map = {}  # Maps section_id to DESC_xxx variable name
+
+    # The section emitter records (pkg, sec_id, is_group) as it assigns IDs;
+    # consume that list instead of re-walking the tree with a second,
+    # parallel numbering. convert() always emits sections first.
+    all_pkgs = getattr(ctx, "_pkg_ids", None)
+    if all_pkgs is None:
+        generate_package_sections(ctx)  # populates ctx._pkg_ids
+        all_pkgs = ctx._pkg_ids
 
     langs = ctx.config.languages or []
     if not langs:
@@ -169,54 +200,65 @@ def generate_package_descriptions(ctx: BuildContext) -> List[str]:
                     "packages.description requires languages when using per-language values."
                 )
 
+    # Resolve the LANG_* constant per language once instead of per
+    # package x language inside the emit loop below.
+    lang_consts = []
+    for lang_cfg in langs:
+        mapping = get_nsis_mapping(lang_cfg.name)
+        if mapping:
+            lang_consts.append((lang_cfg.name, f'${{{mapping.lang_constant}}}'))
+        else:
+            lang_consts.append((lang_cfg.name, f'${{LANG_{lang_cfg.name.upper()}}}'))
+
+    # Single pass: build the LangString definitions and the section
+    # bindings together. Whether any description exists falls out of the
+    # walk itself, so there is no separate any(...) pre-scan.
+    desc_lines: List[str] = []
+    bind_lines: List[str] = []
+    desc_idx = 0
+
     for pkg, sec_id, is_group in all_pkgs:
-        if not pkg.description.is_empty():
-            desc_var = f"DESC_{desc_idx}"
-            desc_idx += 1
-            desc_map[sec_id] = desc_var
-
-            if langs:
-                # Emit a LangString for each configured language.
-                # Use per-language description when provided, otherwise fall
-                # back to the default description.
-                for lang_cfg in langs:
-                    mapping = get_nsis_mapping(lang_cfg.name)
-                    if mapping:
-                        lang_const = f'${{{mapping.lang_constant}}}'
-                    else:
-                        lang_const = f'${{LANG_{lang_cfg.name.upper()}}}'
-                    lang_desc = pkg.description.get_for_language(
-                        lang_cfg.name,
-                        f"packages.{pkg.name}.description",
-                    )
-                    lang_desc = ctx.resolve(lang_desc).replace('"', '$\\"')
-                    lines.append(f'LangString {desc_var} {lang_const} "{lang_desc}"')
-            else:
-                # No configured languages: emit an English LangString as a fallback
-                desc = ctx.resolve(pkg.description.text).replace('"', '$\\"')
-                lines.append(f'LangString {desc_var} ${{LANG_ENGLISH}} "{desc}"')
-    lines.extend([
+        if pkg.description.empty:
+            continue
+        desc_var = f"DESC_{desc_idx}"
+        desc_idx += 1
+
+        if langs:
+            # Emit a LangString for each configured language.
+            # Use per-language description when provided, otherwise fall
+            # back to the default description.
+            for lang_name, lang_const in lang_consts:
+                lang_desc = pkg.description.get_for_language(
+                    lang_name,
+                    f"packages.{pkg.name}.description",
+                )
+                lang_desc = ctx.resolve(lang_desc).translate(_NSIS_QUOTE_TABLE)
+                desc_lines.append(f'LangString {desc_var} {lang_const} "{lang_desc}"')
+        else:
+            # No configured languages: emit an English LangString as a fallback
+            desc = ctx.resolve(pkg.description.text).translate(_NSIS_QUOTE_TABLE)
+            desc_lines.append(f'LangString {desc_var} ${{LANG_ENGLISH}} "{desc}"')
+
+        bind_lines.append(f'  !insertmacro MUI_DESCRIPTION_TEXT ${{{sec_id}}} $({desc_var})')
+
+    if not desc_lines:
+        return []
+
+    return [
+        "; ===========================================================================",
+        "; Component Descriptions (displayed in Components page)",
+        "; ===========================================================================",
+        "",
+        *desc_lines,
         "",
         "; Bind descriptions to sections",
         "!insertmacro MUI_FUNCTION_DESCRIPTION_BEGIN",
-    ])
-
-    # Bind each description to its section or group
-    for pkg, sec_id, is_group in all_pkgs:
-        if not pkg.description.is_empty():
-            if sec_id in desc_map:
-                desc_var = desc_map[sec_id]
-                lines.append(f'  !insertmacro MUI_DESCRIPTION_TEXT ${{{sec_id}}} $({desc_var})')
-            else:
-                # Already emitted literal description above
-                pass
-
-    lines.extend([
+        *bind_lines,
         "!insertmacro MUI_FUNCTION_DESCRIPTION_END",
         "",
-    ])
+    ]
+
 
-    return lines
 
 
 def generate_signing_section(ctx: BuildContext) -> List[str]:
@@ -224,15 +266,14 @@ def generate_signing_section(ctx: BuildContext) -> List[str]:
     signing = ctx.config.signing
     if not signing or not signing.enabled:
         return []
-    return [
-        "; --- Code Signing ---",
-        f"; Certificate: {signing.certificate}",
-        f"; Timestamp:   {signing.timestamp_url}",
-        f"; Verify after build: {signing.verify_signature}",
-        f"; Checksum: {signing.checksum_type} {signing.checksum_value}",
-        f'!finalize \'signtool sign /f "{signing.certificate}" /p "{signing.password}" /t "{signing.timestamp_url}" "%1"\'',
-        "",
-    ]
+    return (_SIGNING_TMPL % {
+        'cert': signing.certificate,
+        'ts': signing.timestamp_url,
+        'verify': signing.verify_signature,
+        'cs_type': signing.checksum_type,
+        'cs_value': signing.checksum_value,
+        'password': signing.password,
+    }).split("\n")
 
 
 def generate_update_section(ctx: BuildContext) -> List[str]:
@@ -240,23 +281,15 @@ def generate_update_section(ctx: BuildContext) -> List[str]:
     upd = ctx.config.update
     if not upd or not upd.enabled:
         return []
-    return [
-        "; --- Auto-Update Configuration ---",
-        f'!define UPDATE_URL "{upd.update_url}"',
-        f'!define DOWNLOAD_URL "{upd.download_url}"',
-        f'!define CHECK_ON_STARTUP "{str(upd.check_on_startup).lower()}"',
-        f'!define BACKUP_ON_UPGRADE "{str(upd.backup_on_upgrade).lower()}"',
-        f'!define REPAIR_ENABLED "{str(upd.repair_enabled).lower()}"',
-        "",
-        'Section "Update Configuration"',
-        f'  WriteRegStr {upd.registry_hive} "{upd.registry_key}" "UpdateURL" "${{UPDATE_URL}}"',
-        f'  WriteRegStr {upd.registry_hive} "{upd.registry_key}" "DownloadURL" "${{DOWNLOAD_URL}}"',
-        f'  WriteRegStr {upd.registry_hive} "{upd.registry_key}" "CheckOnStartup" "${{CHECK_ON_STARTUP}}"',
-        f'  WriteRegStr {upd.registry_hive} "{upd.registry_key}" "BackupOnUpgrade" "${{BACKUP_ON_UPGRADE}}"',
-        f'  WriteRegStr {upd.registry_hive} "{upd.registry_key}" "RepairEnabled" "${{REPAIR_ENABLED}}"',
-        "SectionEnd",
-        "",
-    ]
+    return (_UPDATE_TMPL % {
+        'update_url': upd.update_url,
+        'download_url': upd.download_url,
+        'check': str(upd.check_on_startup).lower(),
+        'backup': str(upd.backup_on_upgrade).lower(),
+        'repair': str(upd.repair_enabled).lower(),
+        'hive': upd.registry_hive,
+        'key': upd.registry_key,
+    }).split("\n")
 
 
 def generate_oninstsuccess(ctx: BuildContext) -> List[str]:
@@ -270,29 +303,46 @@ def generate_oninstsuccess(ctx: BuildContext) -> List[str]:
     if not (cfg.logging and cfg.logging.enabled):
         return []
 
-    lines: List[str] = [
+    lines: List[str] = []
+
+    # Shared subroutine: the per-optional-package skip check is identical
+    # apart from the section and name, so emit it once and call it per
+    # package instead of repeating the 8-line flag-test block.
+    flat = get_flat_packages(ctx)
+    optional_pkgs = [(idx, pkg) for idx, pkg in enumerate(flat) if pkg.optional]
+    if optional_pkgs:
+        lines.extend([
+            "; ------------------------------------------------------------------",
+            "; Helper: log a skip message for a section the user deselected",
+            ";   Usage: Push <name> ; Push <section> ; Call _YPACK_LogSkipIfUnselected",
+            "; ------------------------------------------------------------------",
+            "Function _YPACK_LogSkipIfUnselected",
+            "  Exch $1  ; section id",
+            "  Exch",
+            "  Exch $2  ; component name",
+            "  SectionGetFlags $1 $0",
+            "  IntOp $0 $0 & ${SF_SELECTED}",
+            '  StrCmp $0 "0" 0 _ypack_skip_done',
+            '  !insertmacro LogWrite "Skipping component: $2"',
+            "_ypack_skip_done:",
+            "  Pop $2",
+            "  Pop $1",
+            "FunctionEnd",
+            "",
+        ])
+
+    lines.extend([
         "; ------------------------------------------------------------------",
         "; Installer success callback (runs after all sections complete)",
         "; ------------------------------------------------------------------",
         "Function .onInstSuccess",
-    ]
+    ])
 
     # Emit skip logs for optional packages that were not selected
-    flat = _flatten_packages(cfg.packages)
-    for idx, pkg in enumerate(flat):
-        if pkg.optional:
-            sec = f"SEC_PKG_{idx}"
-            # SectionGetFlags <section> $0 ; IntOp $0 $0 & ${SF_SELECTED}
-            # If result == 0 then section was not selected => log skipping
-            lines.append(f'  SectionGetFlags ${{{sec}}} $0')
-            lines.append('  IntOp $0 $0 & ${SF_SELECTED}')
-            lines.append(f'  StrCmp $0 "0" _pkg_{idx}_skipped _pkg_{idx}_installed')
-            lines.append(f'_pkg_{idx}_skipped:')
-            lines.append(f'  !insertmacro LogWrite "Skipping component: {pkg.name}"')
-            lines.append(f'  Goto _pkg_{idx}_done')
-            lines.append(f'_pkg_{idx}_installed:')
-            lines.append(f'  ; Component {pkg.name} selected/installed (no skip log)')
-            lines.append(f'_pkg_{idx}_done:')
+    for idx, pkg in optional_pkgs:
+        lines.append(f'  Push "{pkg.name}"')
+        lines.append(f'  Push ${{SEC_PKG_{idx}}}')
+        lines.append('  Call _YPACK_LogSkipIfUnselected')
 
     lines.extend([
         '  !insertmacro LogWrite "Installation completed successfully."',
@@ -304,9 +354,23 @@ def generate_oninstsuccess(ctx: BuildContext) -> List[str]:
     return lines
 
 
+def _msg_selector(languages):  # type: ignore[no-untyped-def]
+    """Return a message lookup for user-facing installer text.
+
+    When languages are configured, messages are referenced through their
+    LangString (``$(KEY)``); otherwise the English fallback is emitted
+    literally. Choosing the closure once removes the repeated
+    ``'$(FOO)' if cfg.languages else '...'`` branch at every message site.
+    """
+    if languages:
+        return lambda key, fallback: f'$({key})'
+    return lambda key, fallback: fallback
+
+
 def generate_oninit(ctx: BuildContext) -> List[str]:
     """Emit ``.onInit`` — mutex, signature, sysreq, existing-install, section flags."""
     cfg = ctx.config
+    msg = _msg_selector(cfg.languages)
     lines: List[str] = [
         "; ===========================================================================",
         "; Initialization",
@@ -318,7 +382,7 @@ def generate_oninit(ctx: BuildContext) -> List[str]:
     # ------------------------------------------------------------------
     # Installer Mutex — prevent running two installers at the same time
     # ------------------------------------------------------------------
-    installer_running_text = '$(INSTALLER_RUNNING)' if cfg.languages else 'The installer is already running.'
+    installer_running_text = msg('INSTALLER_RUNNING', 'The installer is already running.')
     lines.extend([
         '  ; Prevent multiple installer instances',
         '  System::Call \'kernel32::CreateMutex(p 0, i 0, t "${APP_NAME}_InstallerMutex") p .r1 ?e\'',
@@ -344,7 +408,7 @@ def generate_oninit(ctx: BuildContext) -> List[str]:
             "  Pop $0",
             '  StrCmp $0 "0" _sig_ok',
         ])
-        sig_failed_text = '$(SIGNATURE_FAILED)' if cfg.languages else 'Signature verification failed. Installation aborted.'
+        sig_failed_text = msg('SIGNATURE_FAILED', 'Signature verification failed. Installation aborted.')
         lines.append(f'  MessageBox MB_OK|MB_ICONSTOP "{sig_failed_text}"')
         lines.extend([
             "  Abort",
@@ -352,49 +416,60 @@ def generate_oninit(ctx: BuildContext) -> List[str]:
             "",
         ])
 
-    # System requirements
+    # System requirements. All PowerShell-based probes are batched into a
+    # single launch — PowerShell cold-start dominates each probe, so one
+    # process instead of three saves seconds of user-visible .onInit time.
+    # The combined script exits with a per-check code so the failure
+    # message stays specific.
     sysreq = cfg.install.system_requirements
     if sysreq:
+        probes = []  # (comment, ps_fragment, failure message)
         if sysreq.min_windows_version:
             mv = sysreq.min_windows_version
-            lines.extend([
-                f"  ; Check minimum Windows version: {mv}",
-                f'  nsExec::ExecToStack \'powershell -NoProfile -Command "& {{ $v = (Get-CimInstance Win32_OperatingSystem).Version; if ([Version]$v -lt [Version]\'{mv}\') {{ exit 1 }} }}"\'',
-                "  Pop $0",
-                '  StrCmp $0 "0" +3 0',
-            ])
-            req_win_text = '$(REQUIRES_WINDOWS)' if cfg.languages else f'Requires Windows {mv} or higher.'
-            lines.append(f'  MessageBox MB_OK|MB_ICONSTOP "{req_win_text}"')
-            lines.extend([
-                "  Abort",
-                "",
-            ])
+            probes.append((
+                f"  ; - minimum Windows version: {mv}",
+                f"$v = (Get-CimInstance Win32_OperatingSystem).Version; if ([Version]$v -lt [Version]\'{mv}\') {{{{ exit {{code}} }}}}",
+                msg('REQUIRES_WINDOWS', f'Requires Windows {mv} or higher.'),
+            ))
         if sysreq.min_free_space_mb:
             mb = sysreq.min_free_space_mb
-            lines.extend([
-                f"  ; Check free disk space >= {mb} MB",
-                f'  nsExec::ExecToStack \'powershell -NoProfile -Command "& {{ $d = (Get-PSDrive ($env:SystemDrive[0])); if ($d.Free / 1MB -lt {mb}) {{ exit 1 }} }}"\'',
-                "  Pop $0",
-                '  StrCmp $0 "0" +3 0',
-            ])
-            space_text = '$(NOT_ENOUGH_SPACE)' if cfg.languages else f'Not enough free disk space. Require at least {mb} MB.'
-            lines.append(f'  MessageBox MB_OK|MB_ICONSTOP "{space_text}"')
-            lines.extend([
-                "  Abort",
-                "",
-            ])
+            probes.append((
+                f"  ; - free disk space >= {mb} MB",
+                f"$d = (Get-PSDrive ($env:SystemDrive[0])); if ($d.Free / 1MB -lt {mb}) {{{{ exit {{code}} }}}}",
+                msg('NOT_ENOUGH_SPACE', f'Not enough free disk space. Require at least {mb} MB.'),
+            ))
         if sysreq.min_ram_mb:
             mb = sysreq.min_ram_mb
+            probes.append((
+                f"  ; - physical memory >= {mb} MB",
+                f"$m = (Get-CimInstance Win32_ComputerSystem).TotalPhysicalMemory / 1MB; if ($m -lt {mb}) {{{{ exit {{code}} }}}}",
+                msg('NOT_ENOUGH_MEMORY', f'Not enough physical memory. Require at least {mb} MB.'),
+            ))
+
+        if probes:
+            ps_body = "; ".join(
+                frag.format(code=code)
+                for code, (_, frag, _) in enumerate(probes, start=1)
+            )
+            lines.append("  ; Check system requirements (single PowerShell launch):")
+            lines.extend(comment for comment, _, _ in probes)
             lines.extend([
-                f"  ; Check physical memory >= {mb} MB",
-                f'  nsExec::ExecToStack \'powershell -NoProfile -Command "& {{ $m = (Get-CimInstance Win32_ComputerSystem).TotalPhysicalMemory / 1MB; if ($m -lt {mb}) {{ exit 1 }} }}"\'',
+                f'  nsExec::ExecToStack \'powershell -NoProfile -Command "& {{ {ps_body} }}"\'',
                 "  Pop $0",
-                '  StrCmp $0 "0" +3 0',
+                '  StrCmp $0 "0" _sysreq_ok',
             ])
-            mem_text = '$(NOT_ENOUGH_MEMORY)' if cfg.languages else f'Not enough physical memory. Require at least {mb} MB.'
-            lines.append(f'  MessageBox MB_OK|MB_ICONSTOP "{mem_text}"')
+            # Dispatch on the exit code. Codes beyond the first (including
+            # unexpected PowerShell failures) fall through to the first
+            # message, matching the old abort-on-any-nonzero behaviour.
+            for code in range(len(probes), 1, -1):
+                lines.append(f'  StrCmp $0 "{code}" _sysreq_fail_{code}')
+            for code, (_, _, fail_text) in enumerate(probes, start=1):
+                if code > 1:
+                    lines.append(f"_sysreq_fail_{code}:")
+                lines.append(f'  MessageBox MB_OK|MB_ICONSTOP "{fail_text}"')
+                lines.append("  Abort")
             lines.extend([
-                "  Abort",
+                "_sysreq_ok:",
                 "",
             ])
         if sysreq.require_admin:
@@ -404,7 +479,7 @@ def generate_oninit(ctx: BuildContext) -> List[str]:
                 "  Pop $0",
                 '  StrCmp $0 "Admin" +3 0',
             ])
-            admin_text = '$(NEED_ADMIN)' if cfg.languages else 'This installer requires administrator privileges.'
+            admin_text = msg('NEED_ADMIN', 'This installer requires administrator privileges.')
             lines.append(f'  MessageBox MB_OK|MB_ICONSTOP "{admin_text}"')
             lines.extend([
                 "  Abort",
@@ -438,16 +513,21 @@ def generate_oninit(ctx: BuildContext) -> List[str]:
             lines.append(f'  StrCpy $CREATE_SC_{sc.idx} "{state}"')
         lines.append('')
 
-    # Section flags for packages
-    flat = _flatten_packages(cfg.packages)
-    for idx, pkg in enumerate(flat):
-        sec = f"SEC_PKG_{idx}"
-        if pkg.optional and not pkg.default:
-            lines.append(f"  SectionSetFlags ${{{sec}}} 0")
-        elif not pkg.optional:
-            # When not optional, make it selected AND read-only (unselectable)
-            # SF_SELECTED | SF_RO = 1 | 16 = 17
-            lines.append(f"  SectionSetFlags ${{{sec}}} 17")
+    # Section flags for packages. Partition once and emit each flag group
+    # as a batch instead of re-deciding the flag value per package:
+    # - optional without default: deselected (0)
+    # - not optional: selected AND read-only (SF_SELECTED | SF_RO = 1 | 16 = 17)
+    #
+    # NOTE: a script-side ${For} loop over an "array" of section indexes
+    # was considered to shrink this block further, but NSIS has no array
+    # type and the ${SEC_PKG_*} defines are not a contiguous index range
+    # once SectionGroups are present, so one SectionSetFlags line per
+    # affected package is already the minimal correct form.
+    flat = get_flat_packages(ctx)
+    optional_off = [idx for idx, pkg in enumerate(flat) if pkg.optional and not pkg.default]
+    required_ro = [idx for idx, pkg in enumerate(flat) if not pkg.optional]
+    lines.extend(f"  SectionSetFlags ${{SEC_PKG_{idx}}} 0" for idx in optional_off)
+    lines.extend(f"  SectionSetFlags ${{SEC_PKG_{idx}}} 17" for idx in required_ro)
 
     lines.extend([
         "FunctionEnd",
@@ -456,7 +536,7 @@ def generate_oninit(ctx: BuildContext) -> List[str]:
     return lines
 
 
-def _generate_existing_install_check(ctx: BuildContext) -> List[str]:
+def _generate_existing_install_check(ctx: BuildContext) -> Sequence[str]:
     """Generate NSIS code for existing-install detection and handling.
 
     Uses ``ExistingInstallConfig`` to drive the behavior.  Supports:
@@ -465,150 +545,130 @@ def _generate_existing_install_check(ctx: BuildContext) -> List[str]:
     * configurable uninstaller args
     * proper _wait_uninstall loop
     * show_version_info in prompt
+
+    The emission itself is delegated to a memoised helper keyed on the
+    handful of scalar inputs that drive it, so identical configurations
+    (e.g. multi-target builds) reuse the assembled fragment. Returns the
+    cached tuple directly — the only caller extends into its own list,
+    so no defensive copy is needed.
     """
     ei = ctx.config.install.existing_install
     if not ei or ei.mode == "none":
-        return []
+        return ()
 
     cfg = ctx.config
-    has_logging = bool(cfg.logging and cfg.logging.enabled)
-    prompt_text = '$(UNINSTALL_NOT_FINISHED)' if cfg.languages else \
-        'The previous uninstaller did not finish.  Retry or cancel installation?'
+    return _emit_existing_install(
+        ctx.effective_reg_view,
+        ei.mode,
+        bool(ei.allow_multiple),
+        bool(ei.version_check),
+        bool(ei.show_version_info),
+        ei.uninstaller_args,
+        ei.uninstall_wait_ms,
+        bool(cfg.languages),
+        bool(cfg.logging and cfg.logging.enabled),
+    )
+
+
+@lru_cache(maxsize=128)
+def _emit_existing_install(
+    reg_view: str,
+    mode: str,
+    allow_multiple: bool,
+    version_check: bool,
+    show_version_info: bool,
+    uninstaller_args,
+    uninstall_wait_ms,
+    has_languages: bool,
+    has_logging: bool,
+) -> tuple:
+    """Assemble the .onInit existing-install fragment from scalar inputs.
+
+    Pure function of its arguments — safe to memoise for the process
+    lifetime. Returns a tuple so cached results cannot be mutated.
+    """
+    msg = _msg_selector(has_languages)
+    prompt_text = msg('UNINSTALL_NOT_FINISHED',
+        'The previous uninstaller did not finish.  Retry or cancel installation?')
 
     # When allow_multiple is True we intentionally DO NOT perform a
     # directory-specific existence check in .onInit (because $INSTDIR is
     # still the default path). Instead we defer the check until the user
     # has chosen an installation directory (directory page leave callback).
-    if ei.allow_multiple:
-        lines: List[str] = [
-            "",
-            "  ; ------------------------------------------------------------------",
-            "  ; Existing-install detection (deferred to directory page because allow_multiple=true)",
-            "  ; ------------------------------------------------------------------",
-            "  ; NOTE: Actual path collision detection will run in Function ExistingInstall_DirLeave",
-        ]
-        return lines
-
-    lines: List[str] = [
-        "",
-        "  ; ------------------------------------------------------------------",
-        "  ; Existing-install detection",
-        "  ; ------------------------------------------------------------------",
-        f'  SetRegView {ctx.effective_reg_view}',
-        '  ReadRegStr $R0 HKLM "${REG_KEY}" "InstallPath"',
-        '  StrCmp $R0 "" _ei_done  ; No previous install registered',
-    ]
+    if allow_multiple:
+        return (_EI_DEFERRED_NOTE,)
 
-    # $R1 = install path for messages / uninstaller call
-    lines.extend([
-        '  StrCpy $R1 $R0',
-    ])
-
-    # Check for uninstaller
-    lines.extend([
-        '  IfFileExists "$R1\\Uninstall.exe" _ei_has_uninst _ei_overwrite_only',
-    ])
-
-    # --- _ei_has_uninst ---
-    lines.append('_ei_has_uninst:')
+    # Fixed preamble: registry lookup, $R1 = install path for messages /
+    # uninstaller call, uninstaller existence check.
+    lines: List[str] = [_EI_HEADER_TMPL % {'reg_view': reg_view}]
 
     # Only read/show installed package version when we have confirmed a real installation
     # (i.e., the uninstaller exists in the registered install directory).
-    if ei.version_check or ei.show_version_info:
+    if version_check or show_version_info:
         lines.extend([
+            '  ; Fast path: the previous installer recorded its version in the',
+            '  ; registry — a single ReadRegStr beats the WinAPI version probe',
+            '  ReadRegStr $R2 HKLM "${REG_KEY}" "Version"',
+            '  StrCpy $R6 "Registry"',
+            '  StrCmp $R2 "" 0 _ei_ver_done',
             '  ; Derive installed package version from Uninstall.exe ProductVersion (WinAPI)',
             '  StrCpy $R6 "ProductVersion"',
             '  Push "$R1\\Uninstall.exe"',
             '  Call _YPACK_GetFileProductVersion',
             '  Pop $R2',
-            '  StrCmp $R2 "" 0 _ei_ver_done',
-            '  ; Fallback: use numeric file version (VS_FIXEDFILEINFO)',
-            '  StrCpy $R6 "FileVersionFixed"',
-            '  GetDLLVersion "$R1\\Uninstall.exe" $0 $1',
-            '  StrCmp $0 0 +2 0',
-            '  Goto +3',
-            '  StrCmp $1 0 +2 0',
-            '  Goto +1',
-            '  StrCpy $R2 ""',
-            '  IntOp $2 $0 >> 16',
-            '  IntOp $3 $0 & 0xFFFF',
-            '  IntOp $4 $1 >> 16',
-            '  IntOp $5 $1 & 0xFFFF',
-            '  StrCpy $R2 "$2.$3.$4.$5"',
-            '  StrCmp $R2 "0.0.0.0" 0 +2',
-            '    StrCpy $R2 ""',
-            '_ei_ver_done:',
         ])
+        lines.append(_EI_VERSION_PROBE_TMPL % {'lbl': '_ei'})
 
         if has_logging:
             lines.extend([
-                '  !insertmacro _YPACK_DebugLog "[YPACK] ExistingInstall: resolved version=$R2 source=$R6 (path=$R1)"',
+                _dbg('ExistingInstall: resolved version=$R2 source=$R6 (path=$R1)'),
             ])
 
     # Version check: skip detection when installed version matches
-    if ei.version_check:
+    if version_check:
         lines.extend([
             '  ; Skip if same version is already installed',
             '  StrCmp $R2 "${APP_VERSION}" _ei_done 0',
             '  StrCmp $R2 "${APP_VERSION_VI}" _ei_done',
         ])
 
-    if ei.mode == "prompt_uninstall":
-        if ei.show_version_info:
-            prompt_ver = '$(EXISTING_INSTALL_PROMPT)' if cfg.languages else 'An existing installation (version $R2) was found at:$\\r$\\n$R1$\\r$\\n$\\r$\\nUninstall it first and continue?'
-            prompt_no_ver = '$(EXISTING_INSTALL_PROMPT_NO_VER)' if cfg.languages else 'An existing installation was found at:$\\r$\\n$R1$\\r$\\n$\\r$\\nUninstall it first and continue?'
-            lines.append('  StrCmp $R2 "" _ei_prompt_no_ver 0')
-            lines.append(f'  MessageBox MB_YESNO|MB_ICONQUESTION "{prompt_ver}" IDYES _ei_do_uninstall IDNO _ei_cancel')
-            lines.append('  Goto _ei_prompt_done')
-            lines.append('_ei_prompt_no_ver:')
-            lines.append(f'  MessageBox MB_YESNO|MB_ICONQUESTION "{prompt_no_ver}" IDYES _ei_do_uninstall IDNO _ei_cancel')
-            lines.append('_ei_prompt_done:')
+    if mode == "prompt_uninstall":
+        if show_version_info:
+            prompt_ver = msg('EXISTING_INSTALL_PROMPT', 'An existing installation (version $R2) was found at:$\\r$\\n$R1$\\r$\\n$\\r$\\nUninstall it first and continue?')
+            prompt_no_ver = msg('EXISTING_INSTALL_PROMPT_NO_VER', 'An existing installation was found at:$\\r$\\n$R1$\\r$\\n$\\r$\\nUninstall it first and continue?')
+            lines.extend(_versioned_msgbox(
+                'MB_YESNO|MB_ICONQUESTION', prompt_ver, prompt_no_ver,
+                '_ei_prompt', box_tail=' IDYES _ei_do_uninstall IDNO _ei_cancel'))
         else:
-            prompt_no_ver = '$(EXISTING_INSTALL_PROMPT_NO_VER)' if cfg.languages else 'An existing installation was found at:$\\r$\\n$R1$\\r$\\n$\\r$\\nUninstall it first and continue?'
+            prompt_no_ver = msg('EXISTING_INSTALL_PROMPT_NO_VER', 'An existing installation was found at:$\\r$\\n$R1$\\r$\\n$\\r$\\nUninstall it first and continue?')
             lines.append(f'  MessageBox MB_YESNO|MB_ICONQUESTION "{prompt_no_ver}" IDYES _ei_do_uninstall IDNO _ei_cancel')
-    elif ei.mode == "auto_uninstall":
+    elif mode == "auto_uninstall":
         lines.append('  Goto _ei_do_uninstall')
-    elif ei.mode == "abort":
-        if ei.show_version_info:
-            abort_ver = '$(EXISTING_INSTALL_ABORT)' if cfg.languages else 'An existing installation (version $R2) was found at $R1. Installation aborted.'
-            abort_no_ver = '$(EXISTING_INSTALL_ABORT_NO_VER)' if cfg.languages else 'An existing installation was found at $R1. Installation aborted.'
-            lines.append('  StrCmp $R2 "" _ei_abort_no_ver 0')
-            lines.append(f'  MessageBox MB_OK|MB_ICONSTOP "{abort_ver}"')
-            lines.append('  Goto _eid_cancel')
-            lines.append('_ei_abort_no_ver:')
-            lines.append(f'  MessageBox MB_OK|MB_ICONSTOP "{abort_no_ver}"')
-            lines.append('  Goto _eid_cancel')
+    elif mode == "abort":
+        if show_version_info:
+            abort_ver = msg('EXISTING_INSTALL_ABORT', 'An existing installation (version $R2) was found at $R1. Installation aborted.')
+            abort_no_ver = msg('EXISTING_INSTALL_ABORT_NO_VER', 'An existing installation was found at $R1. Installation aborted.')
+            lines.extend(_versioned_msgbox(
+                'MB_OK|MB_ICONSTOP', abort_ver, abort_no_ver,
+                '_ei_abort', goto_after='_ei_cancel'))
         else:
-            abort_no_ver = '$(EXISTING_INSTALL_ABORT_NO_VER)' if cfg.languages else 'An existing installation was found at $R1. Installation aborted.'
+            abort_no_ver = msg('EXISTING_INSTALL_ABORT_NO_VER', 'An existing installation was found at $R1. Installation aborted.')
             lines.append(f'  MessageBox MB_OK|MB_ICONSTOP "{abort_no_ver}"')
-            lines.append('  Goto _eid_cancel')
-    elif ei.mode == "overwrite":
+            lines.append('  Goto _ei_cancel')
+    elif mode == "overwrite":
         lines.append('  Goto _ei_done  ; Overwrite mode: skip uninstall')
 
     # --- _ei_do_uninstall ---
-    uninst_args = ei.uninstaller_args or "/S"
-    wait_ms = ei.uninstall_wait_ms
+    uninst_args = uninstaller_args or "/S"
+    wait_ms = uninstall_wait_ms
 
     # If wait_ms < 0, perform an infinite wait (no timeout). Otherwise use a timed loop.
     if wait_ms is not None and int(wait_ms) < 0:
-        lines.extend([
-            '_ei_do_uninstall:',
-        ])
+        lines.append('_ei_do_uninstall:')
         if has_logging:
             lines.append(f'  !insertmacro LogWrite "Running existing uninstaller: $R1\\Uninstall.exe {uninst_args}"')
             lines.append('  !insertmacro LogWrite "Waiting for uninstaller to finish (no timeout)"')
-        lines.extend([
-            f'  ExecWait \'$R1\\Uninstall.exe {uninst_args}\' $R4',
-            '  ; Wait for uninstaller to finish (no timeout)',
-            '  StrCpy $R3 0',
-            '_ei_wait_loop:',
-            '  Sleep 500',
-            '  IntOp $R3 $R3 + 500',
-            '  IfFileExists "$R1\\Uninstall.exe" _ei_wait_loop _ei_wait_done',
-            '_ei_wait_done:',
-            '  ; Verify uninstaller is gone',
-            '  IfFileExists "$R1\\Uninstall.exe" 0 _ei_done',
-        ])
+        lines.append(_EI_WAIT_INFINITE_TMPL % {'uninst_args': uninst_args})
         if has_logging:
             lines.append('  !insertmacro LogWrite "Uninstaller finished."')
         lines.extend([
@@ -617,28 +677,11 @@ def _generate_existing_install_check(ctx: BuildContext) -> List[str]:
         ])
     else:
         # Timed wait loop (default behaviour)
-        lines.extend([
-            '_ei_do_uninstall:',
-        ])
+        lines.append('_ei_do_uninstall:')
         if has_logging:
             lines.append(f'  !insertmacro LogWrite "Running existing uninstaller: $R1\\Uninstall.exe {uninst_args}"')
             lines.append(f'  !insertmacro LogWrite "Waiting for uninstaller to finish (up to {wait_ms}ms)"')
-        lines.extend([
-            f'  ExecWait \'$R1\\Uninstall.exe {uninst_args}\' $R4',
-            '  StrCmp $R4 "0" _ei_done',
-            f'  ; Wait for uninstaller to finish (up to {wait_ms}ms)',
-            '  StrCpy $R3 0',
-            '_ei_wait_loop:',
-            f'  ; Loop: if $R3 >= {wait_ms} goto _ei_wait_done, else continue waiting',
-            f'  IntCmp $R3 {wait_ms} _ei_wait_done _ei_wait_done _ei_wait_continue',
-            '_ei_wait_continue:',
-            '  Sleep 500',
-            '  IntOp $R3 $R3 + 500',
-            '  IfFileExists "$R1\\Uninstall.exe" _ei_wait_loop _ei_wait_done',
-            '_ei_wait_done:',
-            '  ; Verify uninstaller is gone',
-            '  IfFileExists "$R1\\Uninstall.exe" 0 _ei_done',
-        ])
+        lines.append(_EI_WAIT_TIMED_TMPL % {'uninst_args': uninst_args, 'wait_ms': wait_ms})
         if has_logging:
             lines.append('  !insertmacro LogWrite "Uninstaller finished."')
             lines.append('  !insertmacro LogWrite "Uninstaller returned a non-zero exit code."')
@@ -660,33 +703,133 @@ def _generate_existing_install_check(ctx: BuildContext) -> List[str]:
     ])
 
     lines.append('_ei_done:')
-    lines.append(f'  SetRegView lastused')
+    lines.append('  SetRegView lastused')
     lines.append('')
-    return lines
+    return tuple(lines)
+
+
+def _versioned_msgbox(flags: str, with_ver: str, without_ver: str, lbl: str,
+                      box_tail: str = '', goto_after: str = None) -> List[str]:
+    """Emit a MessageBox pair that prefers *with_ver* when $R2 holds a version.
+
+    ``box_tail`` is appended to both MessageBox lines (IDYES/IDNO jump
+    targets); ``goto_after`` emits a Goto after each box instead of the
+    skip label, for plain MB_OK boxes whose arms both leave the block.
+    """
+    out = [f'  StrCmp $R2 "" {lbl}_no_ver 0',
+           f'  MessageBox {flags} "{with_ver}"{box_tail}']
+    if goto_after:
+        out.append(f'  Goto {goto_after}')
+    else:
+        out.append(f'  Goto {lbl}_done')
+    out.append(f'{lbl}_no_ver:')
+    out.append(f'  MessageBox {flags} "{without_ver}"{box_tail}')
+    if goto_after:
+        out.append(f'  Goto {goto_after}')
+    else:
+        out.append(f'{lbl}_done:')
+    return out
+
+
+
+# -----------------------------------------------------------------------
+# DirLeave per-mode emitters. One entry per existing_install mode; the
+# dispatch table replaces an if/elif ladder that had grown a dead
+# duplicate of the auto_uninstall/abort branches.
+# -----------------------------------------------------------------------
+
+def _emit_eid_prompt(msg, show_version_info: bool) -> List[str]:
+    prompt_no_ver = msg('EXISTING_INSTALL_PROMPT_NO_VER', 'An existing installation was found at:$\\r$\\n$R1$\\r$\\n$\\r$\\nUninstall it first and continue?')
+    if not show_version_info:
+        return [f'  MessageBox MB_YESNO|MB_ICONQUESTION "{prompt_no_ver}" IDYES _eid_do_uninstall IDNO _eid_cancel']
+    prompt_ver = msg('EXISTING_INSTALL_PROMPT', 'An existing installation (version $R2) was found at:$\\r$\\n$R1$\\r$\\n$\\r$\\nUninstall it first and continue?')
+    return _versioned_msgbox(
+        'MB_YESNO|MB_ICONQUESTION', prompt_ver, prompt_no_ver,
+        '_eid_prompt', box_tail=' IDYES _eid_do_uninstall IDNO _eid_cancel')
+
+
+def _emit_eid_auto(msg, show_version_info: bool) -> List[str]:
+    return ['  Goto _eid_do_uninstall']
+
+
+def _emit_eid_abort(msg, show_version_info: bool) -> List[str]:
+    abort_no_ver = msg('EXISTING_INSTALL_ABORT_NO_VER', 'An existing installation was found at $R1. Installation aborted.')
+    if not show_version_info:
+        return [
+            f'  MessageBox MB_OK|MB_ICONSTOP "{abort_no_ver}"',
+            '  Goto _eid_cancel',
+        ]
+    abort_ver = msg('EXISTING_INSTALL_ABORT', 'An existing installation (version $R2) was found at $R1. Installation aborted.')
+    return _versioned_msgbox(
+        'MB_OK|MB_ICONSTOP', abort_ver, abort_no_ver,
+        '_eid_abort', goto_after='_eid_cancel')
 
 
-def generate_existing_install_helpers(ctx: BuildContext) -> List[str]:
+def _emit_eid_overwrite(msg, show_version_info: bool) -> List[str]:
+    return ['  Goto _eid_done  ; Overwrite mode: skip uninstall']
+
+
+_EID_MODE_EMITTERS = {
+    "prompt_uninstall": _emit_eid_prompt,
+    "auto_uninstall": _emit_eid_auto,
+    "abort": _emit_eid_abort,
+    "overwrite": _emit_eid_overwrite,
+}
+
+
+def generate_existing_install_helpers(ctx: BuildContext) -> Sequence[str]:
     """Emit helper functions for existing-install handling.
 
     When ``allow_multiple`` is true we generate a directory-page leave
     callback function that checks the *selected* $INSTDIR for an existing
     installation and performs the same prompting/uninstall logic used in
     the .onInit flow.
+
+    Like the .onInit check, the actual emission is specialised per shape:
+    a memoised helper keyed on the scalar inputs evaluates every
+    mode/logging/version branch once and replays the assembled fragment
+    for identical configurations.
     """
     cfg = ctx.config
-    has_logging = bool(cfg.logging and cfg.logging.enabled)
-
     ei = cfg.install.existing_install
     if not ei or ei.mode == "none":
-        return []
-
-    needs_version = bool(ei.version_check or ei.show_version_info)
+        return ()
+
+    return _emit_existing_install_helpers(
+        ctx.effective_reg_view,
+        ei.mode,
+        bool(ei.allow_multiple),
+        bool(ei.version_check),
+        bool(ei.show_version_info),
+        ei.uninstaller_args,
+        ei.uninstall_wait_ms,
+        bool(cfg.languages),
+        bool(cfg.logging and cfg.logging.enabled),
+    )
+
+
+@lru_cache(maxsize=128)
+def _emit_existing_install_helpers(
+    reg_view: str,
+    mode: str,
+    allow_multiple: bool,
+    version_check: bool,
+    show_version_info: bool,
+    uninstaller_args: str,
+    uninstall_wait_ms,
+    has_languages: bool,
+    has_logging: bool,
+) -> tuple:
+    """Assemble the existing-install helper fragment for one config shape."""
+    msg = _msg_selector(has_languages)
+
+    needs_version = version_check or show_version_info
     lines: List[str] = []
 
     # Define _YPACK_DebugLog macro if it will be used anywhere in this helper section.
     # This includes both version-checking code AND allow_multiple logging.
     # Prevents "macro not found" errors when logging or version checking is needed.
-    if needs_version or ei.allow_multiple:
+    if needs_version or allow_multiple:
         # Always define _YPACK_DebugLog macro (either with implementation if logging is on,
         # or as empty stub if logging is off). This prevents "macro not found" errors
         # when the function that calls it is generated.
@@ -695,147 +838,24 @@ def generate_existing_install_helpers(ctx: BuildContext) -> List[str]:
         # like _YPACK_GetFileProductVersion.
         # Use high registers ($R7-$R9) to minimize conflicts with function code.
         
-        if has_logging:
-            lines.extend([
-                '',
-                '  ; ------------------------------------------------------------------',
-                '  ; Early debug log macro (independent from install log; works in .onInit)',
-                '  ; Writes to: $TEMP\\ypack-debug.log',
-                '  ; Implemented as !macro to avoid nested-function stack conflicts.',
-                '  ; Uses $R7/$R8 (high registers) to avoid conflicts with main code.',
-                '  ; ------------------------------------------------------------------',
-                '!macro _YPACK_DebugLog _msg',
-                '  Push $R7',
-                '  Push $R8',
-                '  StrCpy $R7 `${_msg}`',
-                '  FileOpen $R8 "$TEMP\\ypack-debug.log" a',
-                '  IntCmp $R8 0 +4',
-                '  FileSeek $R8 0 END',
-                '  FileWrite $R8 "$R7$\\r$\\n"',
-                '  FileClose $R8',
-                '  Pop $R8',
-                '  Pop $R7',
-                '!macroend',
-                '',
-            ])
-        else:
-            # Logging disabled: define empty stub macro to prevent "macro not found" errors
-            lines.extend([
-                '',
-                '  ; ------------------------------------------------------------------',
-                '  ; Debug log macro stub (logging disabled)',
-                '  ; ------------------------------------------------------------------',
-                '!macro _YPACK_DebugLog _msg',
-                '  ; (logging disabled)',
-                '!macroend',
-                '',
-            ])
-
+        lines.append(_DEBUG_LOG_MACRO if has_logging else _DEBUG_LOG_STUB)
+
+    # The probe function must be emitted for BOTH detection paths: the
+    # .onInit check (allow_multiple=False) and the DirLeave callback each
+    # emit `Call _YPACK_GetFileProductVersion` exactly when needs_version
+    # is set, so this gate already matches every call site — gating it on
+    # allow_multiple as well would drop the function out from under the
+    # .onInit path.
     if needs_version:
-        lines.extend([
-            '',
-            '  ; ------------------------------------------------------------------',
-            '  ; VersionInfo helper: read ProductVersion from a file (WinAPI)',
-            '  ; ------------------------------------------------------------------',
-            'Function _YPACK_GetFileProductVersion',
-            '  Exch $0  ; file path',
-            '  Push $1',
-            '  Push $2',
-            '  Push $3',
-            '  Push $4',
-            '  Push $5',
-            '  Push $6',
-            '  Push $7',
-            '  Push $8',
-            '  StrCpy $9 ""',
-            '  !insertmacro _YPACK_DebugLog "[YPACK] VerInfo: reading ProductVersion from: $0"',
-            '  ; DWORD GetFileVersionInfoSizeW(LPCWSTR lptstrFilename, LPDWORD lpdwHandle);',
-            '  System::Call \'version::GetFileVersionInfoSizeW(w r0, *i .r1) i .r2\'',
-            '  !insertmacro _YPACK_DebugLog "[YPACK] VerInfo: GetFileVersionInfoSizeW -> size=$2"',
-            '  StrCmp $2 0 _ypack_ver_done',
-            '  System::Alloc $2',
-            '  Pop $3',
-            '  !insertmacro _YPACK_DebugLog "[YPACK] VerInfo: Alloc -> ptr=$3"',
-            '  StrCmp $3 0 _ypack_ver_done',
-            '  ; BOOL GetFileVersionInfoW(LPCWSTR, DWORD, DWORD, LPVOID);',
-            '  System::Call \'version::GetFileVersionInfoW(w r0, i 0, i r2, i r3) i .r4\'',
-            '  !insertmacro _YPACK_DebugLog "[YPACK] VerInfo: GetFileVersionInfoW -> ok=$4"',
-            '  StrCmp $4 0 _ypack_ver_free',
-            '  ; BOOL VerQueryValueW(LPCVOID, LPCWSTR, LPVOID*, PUINT);',
-            '  System::Call \'version::VerQueryValueW(i r3, w "\\VarFileInfo\\Translation", *p .r5, *i .r6) i .r7\'',
-            '  !insertmacro _YPACK_DebugLog "[YPACK] VerInfo: Translation query -> ok=$7 ptr=$5 len=$6"',
-            '  StrCmp $7 0 _ypack_ver_fallback_lang',
-            '  ; Read first LANGANDCODEPAGE as a DWORD (low WORD=lang, high WORD=codepage)',
-            '  System::Call "*$5(&i .r8)"',
-            '  IntOp $6 $8 & 0xFFFF',
-            '  IntOp $7 $8 >> 16',
-            '  IntFmt $1 "%04X" $6',
-            '  IntFmt $2 "%04X" $7',
-            '  StrCpy $1 "$1$2"',
-            '  ; If Translation returned 0x00000000, skip it and use common fallbacks',
-            '  StrCmp $1 "00000000" _ypack_ver_fallback_lang',
-            '  Goto _ypack_ver_query',
-            '_ypack_ver_fallback_lang:',
-            '  ; Fallback to common language/codepage combinations',
-            '  ; Try 0409/04B0 (English/Unicode), most common for installers',
-            '  StrCpy $1 "040904B0"',
-            '  Goto _ypack_ver_query',
-            '_ypack_ver_query:',
-            '  StrCpy $2 "\\StringFileInfo\\$1\\ProductVersion"',
-            '  !insertmacro _YPACK_DebugLog "[YPACK] VerInfo: Query ProductVersion with langcp=$1"',
-            '  System::Call \'version::VerQueryValueW(i r3, w r2, *p .r5, *i .r6) i .r7\'',
-            '  StrCmp $7 0 _ypack_ver_try_next_lang',
-            '  System::Call "*$5(&t${NSIS_MAX_STRLEN} .r9)"',
-            '  !insertmacro _YPACK_DebugLog "[YPACK] VerInfo: ProductVersion=$9"',
-            '  StrCmp $9 "" 0 _ypack_ver_ok',
-            '  ; ProductVersion missing: try FileVersion string key',
-            '  StrCpy $2 "\\StringFileInfo\\$1\\FileVersion"',
-            '  !insertmacro _YPACK_DebugLog "[YPACK] VerInfo: ProductVersion empty; trying FileVersion string"',
-            '  System::Call \'version::VerQueryValueW(i r3, w r2, *p .r5, *i .r6) i .r7\'',
-            '  StrCmp $7 0 _ypack_ver_try_next_lang',
-            '  System::Call "*$5(&t${NSIS_MAX_STRLEN} .r9)"',
-            '  Goto _ypack_ver_ok',
-            '_ypack_ver_try_next_lang:',
-            '  !insertmacro _YPACK_DebugLog "[YPACK] VerInfo: Query failed; trying next langcp..."',
-            '  ; Cycle through common langcp values: 040904B0 -> 080404B0 -> 000004B0 -> give up',
-            '  StrCmp $1 "040904B0" 0 +3',
-            '  StrCpy $1 "080404B0"',
-            '  Goto _ypack_ver_query',
-            '  StrCmp $1 "080404B0" 0 +3',
-            '  StrCpy $1 "000004B0"',
-            '  Goto _ypack_ver_query',
-            '  Goto _ypack_ver_free',
-            '_ypack_ver_ok:',
-            '  ; $9 now contains ProductVersion/FileVersion (or empty)',
-            '  StrCpy $9 $9',
-            '_ypack_ver_free:',
-            '  StrCmp $3 0 _ypack_ver_done',
-            '  System::Free $3',
-            '_ypack_ver_done:',
-            '  Pop $8',
-            '  Pop $7',
-            '  Pop $6',
-            '  Pop $5',
-            '  Pop $4',
-            '  Pop $3',
-            '  Pop $2',
-            '  Pop $1',
-            '  Exch $9',
-            'FunctionEnd',
-            '',
-        ])
+        lines.append(_VERINFO_FUNC)
 
-    if not ei.allow_multiple:
-        return lines
+    if not allow_multiple:
+        return tuple(lines)
 
-    prompt_text = '$(UNINSTALL_NOT_FINISHED)' if cfg.languages else \
-        'The previous uninstaller did not finish.  Retry or cancel installation?'
+    prompt_text = msg('UNINSTALL_NOT_FINISHED',
+        'The previous uninstaller did not finish.  Retry or cancel installation?')
 
-    entry_log: List[str] = []
-    if has_logging:
-        entry_log = [
-            '  !insertmacro _YPACK_DebugLog "[YPACK] ExistingInstall_DirLeave: ENTRY user-selected INSTDIR=$INSTDIR"',
-        ]
+    entry_log = _EID_ENTRY_LOG if has_logging else _NO_LOG
 
     lines.extend([
         "",
@@ -845,20 +865,25 @@ def generate_existing_install_helpers(ctx: BuildContext) -> List[str]:
         "Function ExistingInstall_DirLeave",
         "",
         *entry_log,
-        f'  SetRegView {ctx.effective_reg_view}',
+        f'  SetRegView {reg_view}',
         "  ; Check the user-selected directory ($INSTDIR) for an uninstaller",
         '  StrCpy $R1 $INSTDIR',
     ])
 
     if has_logging:
-        lines.append('  !insertmacro _YPACK_DebugLog "[YPACK] ExistingInstall_DirLeave: checking path=$R1"')
+        lines.append(_dbg('ExistingInstall_DirLeave: checking path=$R1'))
 
     lines.extend([
-        '  IfFileExists "$R1\\Uninstall.exe" _eid_has_uninst _eid_check_reg',
+        '  ; Probe once and cache the result in $R5: the registry-match path',
+        '  ; below reuses it instead of a second GetFileAttributes syscall',
+        '  StrCpy $R5 "0"',
+        '  IfFileExists "$R1\\Uninstall.exe" 0 +2',
+        '  StrCpy $R5 "1"',
+        '  StrCmp $R5 "1" _eid_has_uninst _eid_check_reg',
     ])
 
     if has_logging:
-        lines.append('  !insertmacro _YPACK_DebugLog "[YPACK] ExistingInstall_DirLeave: no Uninstall.exe found at selected path, checking registry..."')
+        lines.append(_dbg('ExistingInstall_DirLeave: no Uninstall.exe found at selected path, checking registry...'))
 
     lines.extend([
         '  Goto _eid_done',
@@ -867,7 +892,7 @@ def generate_existing_install_helpers(ctx: BuildContext) -> List[str]:
     ])
 
     if has_logging:
-        lines.append('  !insertmacro _YPACK_DebugLog "[YPACK] ExistingInstall_DirLeave: Uninstall.exe found; checking registry match..."')
+        lines.append(_dbg('ExistingInstall_DirLeave: Uninstall.exe found; checking registry match...'))
 
     lines.extend([
         '  ; Also consider the registered install path as a match',
@@ -875,33 +900,31 @@ def generate_existing_install_helpers(ctx: BuildContext) -> List[str]:
     ])
 
     if has_logging:
-        lines.append('  !insertmacro _YPACK_DebugLog "[YPACK] ExistingInstall_DirLeave: registry InstallPath=$R0"')
+        lines.append(_dbg('ExistingInstall_DirLeave: registry InstallPath=$R0'))
 
     lines.extend([
         '  StrCmp $R0 "$R1" 0 _eid_done',
-        '  ; Path matches registry; still require an actual uninstaller at that path',
-        '  IfFileExists "$R1\\Uninstall.exe" _eid_has_uninst _eid_done',
+        '  ; Path matches registry; still require an actual uninstaller at that',
+        '  ; path (cached probe result from above)',
+        '  StrCmp $R5 "1" _eid_has_uninst _eid_done',
         '',
         '_eid_has_uninst:',
     ])
 
     # Optionally read installed version for prompts / version check
-    if ei.version_check or ei.show_version_info:
-        pre_call_logs: List[str] = []
-        post_call_logs: List[str] = []
-        fallback_logs: List[str] = []
-        if has_logging:
-            pre_call_logs = [
-                '  !insertmacro _YPACK_DebugLog "[YPACK] ExistingInstall_DirLeave: entering ProductVersion branch (target=$R1\\Uninstall.exe)"',
-            ]
-            post_call_logs = [
-                '  !insertmacro _YPACK_DebugLog "[YPACK] ExistingInstall_DirLeave: ProductVersion raw result=$R2"',
-            ]
-            fallback_logs = [
-                '  !insertmacro _YPACK_DebugLog "[YPACK] ExistingInstall_DirLeave: ProductVersion empty -> fallback GetDLLVersion"',
-            ]
+    if needs_version:
+        pre_call_logs = _EID_PRE_CALL_LOG if has_logging else _NO_LOG
+        post_call_logs = _EID_POST_CALL_LOG if has_logging else _NO_LOG
+        fallback_logs = _EID_FALLBACK_LOG if has_logging else _NO_LOG
 
         lines.extend([
+            '  ; Fast path: when the selected directory is the registered install,',
+            '  ; its version was already recorded — skip the WinAPI probe',
+            '  ReadRegStr $R0 HKLM "${REG_KEY}" "InstallPath"',
+            '  StrCmp $R0 "$R1" 0 +4',
+            '  ReadRegStr $R2 HKLM "${REG_KEY}" "Version"',
+            '  StrCpy $R6 "Registry"',
+            '  StrCmp $R2 "" 0 _eid_ver_done',
             '  ; Derive installed package version from Uninstall.exe ProductVersion (WinAPI)',
             '  StrCpy $R6 "ProductVersion"',
             *pre_call_logs,
@@ -931,70 +954,28 @@ def generate_existing_install_helpers(ctx: BuildContext) -> List[str]:
 
         if has_logging:
             lines.extend([
-                '  !insertmacro _YPACK_DebugLog "[YPACK] ExistingInstall_DirLeave: resolved version=$R2 source=$R6 (path=$R1)"',
+                _dbg('ExistingInstall_DirLeave: resolved version=$R2 source=$R6 (path=$R1)'),
             ])
 
     # Version check: skip prompting/uninstall when installed version matches
-    if ei.version_check:
+    if version_check:
         lines.extend([
             '  ; Skip if same version is already installed',
             '  StrCmp $R2 "${APP_VERSION}" _eid_done 0',
             '  StrCmp $R2 "${APP_VERSION_VI}" _eid_done',
         ])
 
-    # Prompt / behavior
-    if ei.mode == "prompt_uninstall":
-        if ei.show_version_info:
-            prompt_ver = '$(EXISTING_INSTALL_PROMPT)' if cfg.languages else 'An existing installation (version $R2) was found at:$\\r$\\n$R1$\\r$\\n$\\r$\\nUninstall it first and continue?'
-            prompt_no_ver = '$(EXISTING_INSTALL_PROMPT_NO_VER)' if cfg.languages else 'An existing installation was found at:$\\r$\\n$R1$\\r$\\n$\\r$\\nUninstall it first and continue?'
-            lines.append('  StrCmp $R2 "" _eid_prompt_no_ver 0')
-            lines.append(f'  MessageBox MB_YESNO|MB_ICONQUESTION "{prompt_ver}" IDYES _eid_do_uninstall IDNO _eid_cancel')
-            lines.append('  Goto _eid_prompt_done')
-            lines.append('_eid_prompt_no_ver:')
-            lines.append(f'  MessageBox MB_YESNO|MB_ICONQUESTION "{prompt_no_ver}" IDYES _eid_do_uninstall IDNO _eid_cancel')
-            lines.append('_eid_prompt_done:')
-        else:
-            prompt_no_ver = '$(EXISTING_INSTALL_PROMPT_NO_VER)' if cfg.languages else 'An existing installation was found at:$\\r$\\n$R1$\\r$\\n$\\r$\\nUninstall it first and continue?'
-            lines.append(f'  MessageBox MB_YESNO|MB_ICONQUESTION "{prompt_no_ver}" IDYES _eid_do_uninstall IDNO _eid_cancel')
-    elif ei.mode == "auto_uninstall":
-        lines.append('  Goto _eid_do_uninstall')
-    elif ei.mode == "abort":
-        if ei.show_version_info:
-            abort_ver = '$(EXISTING_INSTALL_ABORT)' if cfg.languages else 'An existing installation (version $R2) was found at $R1. Installation aborted.'
-            abort_no_ver = '$(EXISTING_INSTALL_ABORT_NO_VER)' if cfg.languages else 'An existing installation was found at $R1. Installation aborted.'
-            lines.append('  StrCmp $R2 "" _eid_abort_no_ver 0')
-            lines.append(f'  MessageBox MB_OK|MB_ICONSTOP "{abort_ver}"')
-            lines.append('  Goto _eid_cancel')
-            lines.append('_eid_abort_no_ver:')
-            lines.append(f'  MessageBox MB_OK|MB_ICONSTOP "{abort_no_ver}"')
-            lines.append('  Goto _eid_cancel')
-        else:
-            abort_no_ver = '$(EXISTING_INSTALL_ABORT_NO_VER)' if cfg.languages else 'An existing installation was found at $R1. Installation aborted.'
-            lines.append(f'  MessageBox MB_OK|MB_ICONSTOP "{abort_no_ver}"')
-            lines.append('  Goto _eid_cancel')
-    elif ei.mode == "auto_uninstall":
-        lines.append('  Goto _eid_do_uninstall')
-    elif ei.mode == "abort":
-        if ei.show_version_info:
-            lines.extend([
-                '  StrCmp $R2 "" _eid_abort_no_ver 0',
-                '  MessageBox MB_OK|MB_ICONSTOP "An existing installation (version $R2) was found at $R1. Installation aborted."',
-                '  Goto _eid_cancel',
-                '_eid_abort_no_ver:',
-                '  MessageBox MB_OK|MB_ICONSTOP "An existing installation was found at $R1. Installation aborted."',
-                '  Goto _eid_cancel',
-            ])
-        else:
-            lines.extend([
-                '  MessageBox MB_OK|MB_ICONSTOP "An existing installation was found at $R1. Installation aborted."',
-                '  Goto _eid_cancel',
-            ])
-    elif ei.mode == "overwrite":
-        lines.append('  Goto _eid_done  ; Overwrite mode: skip uninstall')
+    # Prompt / behavior — one dispatch per mode (the emitters live at
+    # module scope so the table is built once).
+    try:
+        emit_mode = _EID_MODE_EMITTERS[mode]
+    except KeyError:
+        raise ValueError(f"Unknown existing_install mode: {mode!r}")
+    lines.extend(emit_mode(msg, show_version_info))
 
     # Uninstall execution and wait loop
-    uninst_args = ei.uninstaller_args or "/S"
-    wait_ms = ei.uninstall_wait_ms
+    uninst_args = uninstaller_args or "/S"
+    wait_ms = uninstall_wait_ms
 
     if wait_ms is not None and int(wait_ms) < 0:
         lines.extend([
@@ -1034,7 +1015,7 @@ def generate_existing_install_helpers(ctx: BuildContext) -> List[str]:
     ])
 
     if has_logging:
-        lines.append('  !insertmacro _YPACK_DebugLog "[YPACK] ExistingInstall_DirLeave: EXIT (no conflict or after uninstall)"')
+        lines.append(_dbg('ExistingInstall_DirLeave: EXIT (no conflict or after uninstall)'))
 
     lines.extend([
         '  SetRegView lastused',
@@ -1043,53 +1024,67 @@ def generate_existing_install_helpers(ctx: BuildContext) -> List[str]:
         '',
     ])
 
-    return lines
+    return tuple(lines)
 
 
 def generate_uninit(ctx: BuildContext) -> List[str]:
     """Emit ``un.onInit`` \u2014 uninstaller mutex and confirmation."""
     cfg = ctx.config
-    lines: List[str] = [
-        "; ===========================================================================",
-        "; Uninstaller Initialization",
-        "; ===========================================================================",
-        "Function un.onInit",
-        "",
-        '  ; Prevent multiple uninstaller instances',
-        '  System::Call \'kernel32::CreateMutex(p 0, i 0, t "${APP_NAME}_UninstallerMutex") p .r1 ?e\'',
-        '  Pop $R0',
-        '  StrCmp $R0 "0" +3 0',
-        '  MessageBox MB_OK|MB_ICONEXCLAMATION "The uninstaller is already running."',
-        '  Abort',
-        '',
-    ]
-
-    # Logging
-    if cfg.logging and cfg.logging.enabled:
-        lines.extend([
-            '!ifdef NSIS_CONFIG_LOG',
-            '  LogSet on',
-            '!endif',
-        ])
-
-    lines.extend([
-        "FunctionEnd",
-        "",
-    ])
-    return lines
+    log_block = _UNINIT_LOG_BLOCK if cfg.logging and cfg.logging.enabled else ""
+    return [_UNINIT_TMPL % {'log_block': log_block}]
 
 
 # -----------------------------------------------------------------------
 # Internal
 # -----------------------------------------------------------------------
 
+def _dir_entries(ctx: BuildContext, dir_path: str) -> frozenset:
+    """Entry names in *dir_path*, read once per directory per build.
+
+    Packages with many sources in the same directory would otherwise
+    issue one ``stat`` per file; a single ``scandir`` answers all of
+    them. Cached on the build context like :func:`get_flat_packages` —
+    long-lived processes (the web server) convert repeatedly and must
+    see files added or removed between builds. Missing or unreadable
+    directories yield an empty set.
+    """
+    cache = getattr(ctx, "_dir_entries", None)
+    if cache is None:
+        cache = ctx._dir_entries = {}
+    entries = cache.get(dir_path)
+    if entries is None:
+        try:
+            with os.scandir(dir_path) as it:
+                entries = frozenset(entry.name for entry in it)
+        except OSError:
+            entries = frozenset()
+        cache[dir_path] = entries
+    return entries
+
+
+def _file_lines(ctx: BuildContext, sources) -> List[str]:
+    """Build ``File`` directives for *sources*, choosing /r when appropriate.
+
+    Existence checks are answered from the per-directory listing cache
+    instead of one syscall per source; the exact-name miss falls back to
+    ``os.path.exists`` so case-insensitive filesystems keep the old
+    behaviour when the config's casing differs from the disk's.
+    """
+    out: List[str] = []
+    for source in sources:
+        resolved = ctx.resolve_path(source)
+        parent, name = os.path.split(resolved)
+        if name in _dir_entries(ctx, parent or ".") or os.path.exists(resolved):
+            path_for_nsi = resolved
+        else:
+            path_for_nsi = _normalize_path(source)
+        if _should_use_recursive(source):
+            out.append(f'  File /r "{path_for_nsi}"')
+        else:
+            out.append(f'  File "{path_for_nsi}"')
+    return out
+
+
 def _file_line(ctx: BuildContext, source: str) -> str:
-    """Build a single ``File`` directive, choosing /r when appropriate."""
-    resolved = ctx.resolve_path(source)
-    if os.path.exists(resolved):
-        path_for_nsi = resolved
-    else:
-        path_for_nsi = _normalize_path(source)
-    if _should_use_recursive(source):
-        return f'  File /r "{path_for_nsi}"'
-    return f'  File "{path_for_nsi}"'
+    """Build a single ``File`` directive (thin wrapper over ``_file_lines``)."""
+    return _file_lines(ctx, (source,))[0]
@@ -12,9 +12,18 @@ from __future__ import annotations
 
 import os
 import re
+from functools import lru_cache
+from itertools import groupby
 from typing import List, NamedTuple, Optional
 
 from .context import BuildContext
+from .nsis_templates import (
+    _ARP_REG_TMPL,
+    _ENV_PATH_APPEND_TMPL,
+    _ENV_PATH_REMOVE_TMPL,
+    _EST_SIZE_TMPL,
+    _UNINST_WRITE_BLOCK,
+)
 from ..config import LangText, ShortcutConfig
 
 
@@ -25,18 +34,40 @@ class ShortcutEntry(NamedTuple):
     config: ShortcutConfig      # ShortcutConfig instance
     section: str        # "global" or "SEC_PKG_<n>"
     resolved_name: str  # Resolved .lnk display name
+    base_dir: str       # Escaped base directory (e.g. $DESKTOP)
+    link_path: str      # Escaped full .lnk path
+    target: str         # Escaped resolved target path
+    args: str           # Escaped resolved arguments ("" if none)
+    icon: str           # Escaped resolved icon path ("" if none)
 
 
 # -----------------------------------------------------------------------
 # Path utilities
 # -----------------------------------------------------------------------
 
+# Compiled once at import: _normalize_path and _resolve_shortcut_path run
+# for every file source and shortcut in the configuration.
+_SLASH_TABLE = str.maketrans({"/": "\\"})
+_DRIVE_RE = re.compile(r"^[A-Za-z]:\\")
+
+# %-style templates for the hottest registry lines: one C-level
+# PyUnicode_Format call per line instead of per-field f-string steps.
+_WRS = '  WriteRegStr %s "%s" "%s" "%s"'
+_WRD = '  WriteRegDWORD %s "%s" "%s" %s'
+_WRE = '  WriteRegExpandStr %s "%s" "%s" "%s"'
+_DRV = '  DeleteRegValue %s "%s" "%s"'
+_DRK_IFEMPTY = '  DeleteRegKey /ifempty %s "%s"'
+# Fixed two-line head of every file-association block.
+_FA_HEAD = '  ; File association: %s -> %s\n  WriteRegStr %s "%s%s" "" "%s"' 
+
+
 def _normalize_path(path: str) -> str:
     """Convert glob-style paths to NSIS-compatible Windows paths."""
-    path = path.replace("/**/", "\\")
-    path = path.replace("**/", "")
-    path = path.replace("/", "\\")
-    return path
+    # Recursive-glob markers are rare; check once so the common case is a
+    # single table-driven translate.
+    if "**" in path:
+        path = path.replace("/**/", "\\").replace("**/", "")
+    return path.translate(_SLASH_TABLE)
 
 
 def _escape_nsis(value: str) -> str:
@@ -46,8 +77,8 @@ def _escape_nsis(value: str) -> str:
 def _resolve_shortcut_path(ctx: BuildContext, path: str) -> str:
     if not path:
         return ""
-    resolved = ctx.resolve(path).replace("/", "\\")
-    if not (resolved.startswith("$") or re.match(r"^[A-Za-z]:\\", resolved)):
+    resolved = ctx.resolve(path).translate(_SLASH_TABLE)
+    if not (resolved.startswith("$") or _DRIVE_RE.match(resolved)):
         resolved = f"$INSTDIR\\{resolved}"
     return resolved
 
@@ -63,25 +94,32 @@ def _shortcut_kind(location: str) -> str:
     return "custom"
 
 
-def _shortcut_base_dir(ctx: BuildContext, sc: ShortcutEntry) -> str:
-    if sc.sc_type == "desktop":
+def _shortcut_base_dir(ctx: BuildContext, sc_type: str, location: str) -> str:
+    if sc_type == "desktop":
         return "$DESKTOP"
-    if sc.sc_type == "startmenu":
+    if sc_type == "startmenu":
         return "$SMPROGRAMS\\${APP_NAME}"
-    if sc.sc_type == "quicklaunch":
+    if sc_type == "quicklaunch":
         return "$QUICKLAUNCH"
-    return _resolve_shortcut_path(ctx, sc.config.location)
-
-
-def _shortcut_link_path(ctx: BuildContext, sc: ShortcutEntry) -> str:
-    base_dir = _shortcut_base_dir(ctx, sc).rstrip("\\")
-    return f"{base_dir}\\{sc.resolved_name}.lnk"
+    return _resolve_shortcut_path(ctx, location)
 
 
 def _should_use_recursive(source: str) -> bool:
     return bool(source) and "**" in source
 
 
+@lru_cache(maxsize=None)
+def _source_paths(source: str) -> tuple:
+    """Normalized path and derived names for one source string.
+
+    The installer and uninstaller passes derive the same values from the
+    same sources; keyed on the string, the second pass is a cache hit.
+    Returns ``(normalized, basename, glob_dirname)``.
+    """
+    norm = _normalize_path(source)
+    return norm, os.path.basename(norm), os.path.basename(norm.rstrip("\\*"))
+
+
 # -----------------------------------------------------------------------
 # Installer Section
 # -----------------------------------------------------------------------
@@ -90,13 +128,20 @@ def generate_installer_section(ctx: BuildContext) -> List[str]:
     """Emit the main ``Section "Install"``."""
     cfg = ctx.config
     has_logging = cfg.logging and cfg.logging.enabled
-    lines: List[str] = [
+    # The inetc plugin include has to precede the section header, so decide
+    # up front instead of insert(0)-shifting the list afterwards.
+    has_remote = any(fe.is_remote for fe in cfg.files)
+    lines: List[str] = []
+    if has_remote:
+        lines.append("; Plugin: inetc for HTTP downloads")
+        lines.append('!include "inetc.nsh"')
+    lines.extend([
         "; ===========================================================================",
         '; Installer Section',
         "; ===========================================================================",
         'Section "-Install" SEC_INSTALL',
         "",
-    ]
+    ])
 
     # --- Logging: begin ---
     if has_logging:
@@ -104,92 +149,89 @@ def generate_installer_section(ctx: BuildContext) -> List[str]:
         lines.append('  !insertmacro LogWrite "Install directory: $INSTDIR"')
         lines.append("")
 
-    # Track whether we need the inetc plugin
-    has_remote = any(fe.is_remote for fe in cfg.files)
-    if has_remote:
-        lines.insert(0, '!include "inetc.nsh"')
-        lines.insert(0, "; Plugin: inetc for HTTP downloads")
-
     # --- Files ---
     if has_logging:
         lines.append('  !insertmacro LogWrite "Copying files ..."')
     current_outpath: Optional[str] = None
-    for fe in cfg.files:
-        dest = fe.destination or "$INSTDIR"
-
-        if fe.is_remote:
-            # Remote download
-            url = fe.source
-            filename = url.rsplit("/", 1)[-1] or "download"
-            if dest != current_outpath:
-                lines.append(f'  SetOutPath "{dest}"')
-                current_outpath = dest
-            lines.append(f"  ; Download: {url}")
-            lines.append(f'  inetc::get /SILENT "{url}" "$OUTDIR\\{filename}" /END')
-            lines.append("  Pop $0")
-            lines.append('  StrCmp $0 "OK" +3 0')
-            lines.append('  MessageBox MB_OK|MB_ICONSTOP "Download failed: $0"')
-            lines.append("  Abort")
-            if fe.checksum_type:
-                lines.append(f"  ; Verify checksum: {fe.checksum_type} {fe.checksum_value}")
-                lines.append(f'  Push "$OUTDIR\\{filename}"')
-                lines.append(f'  Push "{fe.checksum_type}"')
-                lines.append(f'  Push "{fe.checksum_value}"')
-                lines.append("  Call VerifyChecksum")
-                lines.append("  Pop $0")
-                lines.append('  StrCmp $0 "0" +3 0')
-                lines.append('  MessageBox MB_OK|MB_ICONSTOP "Checksum verification failed"')
-                lines.append("  Abort")
-            if fe.decompress:
-                lines.append(f'  Push "$OUTDIR\\{filename}"')
-                lines.append(f'  Push "{dest}"')
-                lines.append("  Call ExtractArchive")
-        else:
-            # Local file / directory
+    append = lines.append
+    source_paths = _source_paths
+    files = cfg.files
+    if cfg.install.group_by_destination:
+        # Stable sort: entries sharing a destination become contiguous so
+        # the current_outpath check below collapses their SetOutPath to
+        # one, while user order within a destination is preserved.
+        files = sorted(files, key=lambda fe: (fe.is_remote, fe.destination or "$INSTDIR"))
+    if not has_remote:
+        # Specialized pass for the common all-local configuration: the
+        # remote/checksum/decompress branches drop out of the loop body.
+        for fe in files:
+            dest = fe.destination or "$INSTDIR"
             if dest != current_outpath:
-                lines.append(f'  SetOutPath "{dest}"')
+                append(f'  SetOutPath "{dest}"')
                 current_outpath = dest
-            norm = _normalize_path(fe.source)
-            if _should_use_recursive(fe.source):
-                lines.append(f'  File /r "{norm}"')
+            src = fe.source
+            norm = source_paths(src)[0]
+            if src and "**" in src:
+                append(f'  File /r "{norm}"')
             else:
-                lines.append(f'  File "{norm}"')
+                append(f'  File "{norm}"')
+    else:
+        for fe in files:
+            dest = fe.destination or "$INSTDIR"
+
+            if fe.is_remote:
+                # Remote download — the whole burst goes in as one pre-joined
+                # block per file instead of six-plus appends.
+                url = fe.source
+                filename = url.rsplit("/", 1)[-1] or "download"
+                if dest != current_outpath:
+                    append(f'  SetOutPath "{dest}"')
+                    current_outpath = dest
+                append(f"""  ; Download: {url}
+  inetc::get /SILENT "{url}" "$OUTDIR\\{filename}" /END
+  Pop $0
+  StrCmp $0 "OK" +3 0
+  MessageBox MB_OK|MB_ICONSTOP "Download failed: $0"
+  Abort""")
+                if fe.checksum_type:
+                    append(f"""  ; Verify checksum: {fe.checksum_type} {fe.checksum_value}
+  Push "$OUTDIR\\{filename}"
+  Push "{fe.checksum_type}"
+  Push "{fe.checksum_value}"
+  Call VerifyChecksum
+  Pop $0
+  StrCmp $0 "0" +3 0
+  MessageBox MB_OK|MB_ICONSTOP "Checksum verification failed"
+  Abort""")
+                if fe.decompress:
+                    append(f"""  Push "$OUTDIR\\{filename}"
+  Push "{dest}"
+  Call ExtractArchive""")
+            else:
+                # Local file / directory
+                if dest != current_outpath:
+                    append(f'  SetOutPath "{dest}"')
+                    current_outpath = dest
+                src = fe.source
+                norm = source_paths(src)[0]
+                if src and "**" in src:
+                    append(f'  File /r "{norm}"')
+                else:
+                    append(f'  File "{norm}"')
 
     lines.append("")
 
     # --- Uninstaller ---
-    lines.extend([
-        "  ; Write uninstaller",
-        "  SetOutPath $INSTDIR",
-        '  WriteUninstaller "$INSTDIR\\Uninstall.exe"',
-        "",
-    ])
+    lines.append(_UNINST_WRITE_BLOCK)
     if has_logging:
         lines.append('  !insertmacro LogWrite "Uninstaller created."')
         lines.append("")
 
     # --- Standard registry (Add/Remove Programs) ---
+    # DisplayIcon uses the uninstaller's embedded icon (MUI_ICON is
+    # embedded during compilation).
     reg_view = ctx.effective_reg_view
-    lines.extend([
-        f"  ; Application registry entries (using {reg_view}-bit registry view)",
-        f'  SetRegView {reg_view}',
-        '  WriteRegStr HKLM "${REG_KEY}" "InstallPath" "$INSTDIR"',
-        '  WriteRegStr HKLM "${REG_KEY}" "Version" "${APP_VERSION}"',
-        '',
-        '  ; Add/Remove Programs (ARP) registry entries',
-        '  WriteRegStr HKLM "Software\\Microsoft\\Windows\\CurrentVersion\\Uninstall\\${APP_NAME}" "DisplayName" "${APP_NAME}"',
-        '  WriteRegStr HKLM "Software\\Microsoft\\Windows\\CurrentVersion\\Uninstall\\${APP_NAME}" "DisplayVersion" "${APP_VERSION}"',
-        '  WriteRegStr HKLM "Software\\Microsoft\\Windows\\CurrentVersion\\Uninstall\\${APP_NAME}" "Publisher" "${APP_PUBLISHER}"',
-        '  WriteRegStr HKLM "Software\\Microsoft\\Windows\\CurrentVersion\\Uninstall\\${APP_NAME}" "UninstallString" "$\\\"$INSTDIR\\Uninstall.exe$\\\""',
-        '  WriteRegStr HKLM "Software\\Microsoft\\Windows\\CurrentVersion\\Uninstall\\${APP_NAME}" "QuietUninstallString" "$\\\"$INSTDIR\\Uninstall.exe$\\\" /S"',
-        '  WriteRegStr HKLM "Software\\Microsoft\\Windows\\CurrentVersion\\Uninstall\\${APP_NAME}" "InstallLocation" "$INSTDIR"',
-        '  WriteRegDWORD HKLM "Software\\Microsoft\\Windows\\CurrentVersion\\Uninstall\\${APP_NAME}" "NoModify" 1',
-        '  WriteRegDWORD HKLM "Software\\Microsoft\\Windows\\CurrentVersion\\Uninstall\\${APP_NAME}" "NoRepair" 1',
-    ])
-    # DisplayIcon — use uninstaller's embedded icon (MUI_ICON is embedded during compilation)
-    lines.append('  WriteRegStr HKLM "Software\\Microsoft\\Windows\\CurrentVersion\\Uninstall\\${APP_NAME}" "DisplayIcon" "$INSTDIR\\Uninstall.exe,0"')
-    lines.append('  SetRegView lastused')
-    lines.append('')
+    lines.append(_ARP_REG_TMPL % {'reg_view': reg_view})
 
     if has_logging:
         lines.append('  !insertmacro LogWrite "Registry entries written."')
@@ -211,13 +253,7 @@ def generate_installer_section(ctx: BuildContext) -> List[str]:
     _emit_file_associations(ctx, lines)
 
     # Estimated install size
-    lines.append("  ; Calculate installed size")
-    lines.append('  ${GetSize} "$INSTDIR" "/S=0K" $0 $1 $2')
-    lines.append('  IntFmt $0 "0x%08X" $0')
-    lines.append(f'  SetRegView {reg_view}')
-    lines.append('  WriteRegDWORD HKLM "Software\\Microsoft\\Windows\\CurrentVersion\\Uninstall\\${APP_NAME}" "EstimatedSize" $0')
-    lines.append('  SetRegView lastused')
-    lines.append("")
+    lines.append(_EST_SIZE_TMPL % {'reg_view': reg_view})
 
 
 
@@ -257,20 +293,20 @@ def generate_uninstaller_section(ctx: BuildContext) -> List[str]:
             filename = fe.source.rsplit("/", 1)[-1] or "download"
             lines.append(f'  Delete "{dest}\\{filename}"')
         elif _should_use_recursive(fe.source):
-            dirname = os.path.basename(_normalize_path(fe.source).rstrip("\\*"))
+            dirname = _source_paths(fe.source)[2]
             if dirname and dirname != "*":
                 lines.append(f'  RMDir /r "{dest}\\{dirname}"')
             else:
                 lines.append(f'  RMDir /r "{dest}"')
         else:
-            filename = os.path.basename(_normalize_path(fe.source))
+            filename = _source_paths(fe.source)[1]
             lines.append(f'  Delete "{dest}\\{filename}"')
 
     # Remove packages files
     if cfg.packages:
         lines.append("")
         lines.append("  ; Remove package files")
-        for pkg in _flatten_packages(cfg.packages):
+        for pkg in get_flat_packages(ctx):
             for src_entry in pkg.sources:
                 dest = src_entry.get("destination", "$INSTDIR")
                 lines.append(f'  RMDir /r "{dest}"')
@@ -300,7 +336,7 @@ def generate_uninstaller_section(ctx: BuildContext) -> List[str]:
         "  ; Remove registry entries",
         f'  SetRegView {reg_view}',
         '  DeleteRegKey HKLM "${REG_KEY}"',
-        '  DeleteRegKey HKLM "Software\\Microsoft\\Windows\\CurrentVersion\\Uninstall\\${APP_NAME}"',
+        '  DeleteRegKey HKLM "${ARP_KEY}"',
         '  SetRegView lastused',
         "",
     ])
@@ -308,28 +344,24 @@ def generate_uninstaller_section(ctx: BuildContext) -> List[str]:
     # Remove custom registry values
     if cfg.install.registry_entries:
         lines.append("  ; Remove custom registry entries")
-        current_view: Optional[str] = None
-        # Track which keys we've deleted values from, so we can clean empty keys
-        keys_to_clean: List[tuple] = []  # (hive, key)
-        for entry in cfg.install.registry_entries:
-            key = ctx.resolve(entry.key)
-            target_view = entry.view if entry.view in ("32", "64") else None
-            if target_view != current_view:
-                if current_view is not None:
-                    lines.append("  SetRegView lastused")
-                if target_view is not None:
-                    lines.append(f"  SetRegView {target_view}")
-                current_view = target_view
-            lines.append(f'  DeleteRegValue {entry.hive} "{key}" "{entry.name}"')
-            if (entry.hive, key) not in keys_to_clean:
-                keys_to_clean.append((entry.hive, key))
-        if current_view is not None:
-            lines.append("  SetRegView lastused")
+        # Track which keys we've deleted values from, so we can clean empty
+        # keys. A dict doubles as an insertion-ordered set with O(1)
+        # membership, unlike the linear scan of a list.
+        keys_to_clean: dict = {}  # (hive, key) -> None
+        for view, group in _entries_by_view(cfg.install.registry_entries):
+            if view is not None:
+                lines.append(f"  SetRegView {view}")
+            for entry in group:
+                key = ctx.resolve(entry.key)
+                lines.append(_DRV % (entry.hive, key, entry.name))
+                keys_to_clean.setdefault((entry.hive, key))
+            if view is not None:
+                lines.append("  SetRegView lastused")
         # Clean up empty registry keys left behind
         if keys_to_clean:
             lines.append("  ; Remove empty registry keys (only if no remaining values)")
             for hive, key in keys_to_clean:
-                lines.append(f'  DeleteRegKey /ifempty {hive} "{key}"')
+                lines.append(_DRK_IFEMPTY % (hive, key))
         lines.append("")
 
     # Remove file associations
@@ -366,7 +398,7 @@ def generate_uninstaller_section(ctx: BuildContext) -> List[str]:
 
 def _emit_per_package_uninstall(ctx: BuildContext, lines: List[str]) -> None:
     """Emit cleanup for per-package registry, env vars, shortcuts, file associations."""
-    for pkg in _flatten_packages(ctx.config.packages):
+    for pkg in get_flat_packages(ctx):
         has_actions = (pkg.registry_entries or pkg.env_vars or
                        pkg.desktop_shortcut or pkg.start_menu_shortcut or pkg.shortcuts or
                        pkg.file_associations)
@@ -394,19 +426,30 @@ def _emit_per_package_uninstall(ctx: BuildContext, lines: List[str]) -> None:
             hive, key = _env_hive_key(env)
             if env.append and env.name.upper() == "PATH":
                 env_value = ctx.resolve(env.value)
-                lines.extend([
-                    f"  ; Remove PATH entry: {env_value}",
-                    f'  ReadRegStr $0 {hive} "{key}" "{env.name}"',
-                    f'  StrCpy $1 "{env_value}"',
-                    "  Call un._RemovePathEntry",
-                    f'  WriteRegExpandStr {hive} "{key}" "{env.name}" "$0"',
-                    '  SendMessage ${HWND_BROADCAST} ${WM_SETTINGCHANGE} 0 "STR:Environment" /TIMEOUT=500',
-                ])
+                lines.append(_ENV_PATH_REMOVE_TMPL % {
+                    'hive': hive, 'key': key, 'name': env.name, 'value': env_value,
+                })
             else:
                 lines.append(f'  DeleteRegValue {hive} "{key}" "{env.name}"')
         lines.append("")
 
 
+def _entry_view(entry) -> Optional[str]:
+    return entry.view if entry.view in ("32", "64") else None
+
+
+def _entries_by_view(entries):
+    """Group registry entries into contiguous same-view blocks.
+
+    A stable sort keyed on the effective view ("" for the default view)
+    brings same-view entries together, so each block needs exactly one
+    ``SetRegView X`` … ``SetRegView lastused`` pair instead of per-entry
+    toggles; configuration order is preserved within each block.
+    """
+    return groupby(sorted(entries, key=lambda e: _entry_view(e) or ""),
+                   key=_entry_view)
+
+
 def _emit_registry_writes(ctx: BuildContext, lines: List[str]) -> None:
     """Emit WriteRegStr / WriteRegDWORD for custom registry entries.
 
@@ -417,25 +460,21 @@ def _emit_registry_writes(ctx: BuildContext, lines: List[str]) -> None:
         return
 
     lines.append("  ; Custom registry entries")
-    current_view: Optional[str] = None
-    for entry in entries:
-        key = ctx.resolve(entry.key)
-        value = ctx.resolve(entry.value)
-        target_view = entry.view if entry.view in ("32", "64") else None
-        if target_view != current_view:
-            if current_view is not None:
-                lines.append("  SetRegView lastused")
-            if target_view is not None:
-                lines.append(f"  SetRegView {target_view}")
-            current_view = target_view
-        if entry.type == "dword":
-            lines.append(f'  WriteRegDWORD {entry.hive} "{key}" "{entry.name}" {value}')
-        elif entry.type == "expand":
-            lines.append(f'  WriteRegExpandStr {entry.hive} "{key}" "{entry.name}" "{value}"')
-        else:
-            lines.append(f'  WriteRegStr {entry.hive} "{key}" "{entry.name}" "{value}"')
-    if current_view is not None:
-        lines.append("  SetRegView lastused")
+    resolve = ctx.resolve
+    for view, group in _entries_by_view(entries):
+        if view is not None:
+            lines.append(f"  SetRegView {view}")
+        for entry in group:
+            key = resolve(entry.key)
+            value = resolve(entry.value)
+            if entry.type == "dword":
+                lines.append(_WRD % (entry.hive, key, entry.name, value))
+            elif entry.type == "expand":
+                lines.append(_WRE % (entry.hive, key, entry.name, value))
+            else:
+                lines.append(_WRS % (entry.hive, key, entry.name, value))
+        if view is not None:
+            lines.append("  SetRegView lastused")
     lines.append("")
 
 
@@ -447,28 +486,9 @@ def _emit_env_var_writes(ctx: BuildContext, lines: List[str]) -> None:
         lines.append(f"  ; Environment variable: {env.name} ({env.scope})")
 
         if env.append and env.name.upper() == "PATH":
-            lines.extend([
-                f'  ReadRegStr $0 {hive} "{key}" "{env.name}"',
-                f'  StrCpy $1 "{env_value}"',
-                "",
-                '  ; Check whether the entry already exists',
-                '  Push $0',
-                '  Push $1',
-                "  Call _StrContains",
-                '  StrCmp $R9 "1" _skip_path_append',
-                "",
-                '  ; Append entry',
-                '  StrCmp $0 "" 0 +2',
-                f'    StrCpy $0 "{env_value}"',
-                '  Goto +2',
-                f'    StrCpy $0 "$0;{env_value}"',
-                f'  WriteRegExpandStr {hive} "{key}" "{env.name}" "$0"',
-                "",
-                '  ; Broadcast WM_SETTINGCHANGE',
-                '  SendMessage ${HWND_BROADCAST} ${WM_SETTINGCHANGE} 0 "STR:Environment" /TIMEOUT=500',
-                "",
-                "_skip_path_append:",
-            ])
+            lines.append(_ENV_PATH_APPEND_TMPL % {
+                'hive': hive, 'key': key, 'name': env.name, 'value': env_value,
+            })
         else:
             lines.append(f'  WriteRegStr {hive} "{key}" "{env.name}" "{env_value}"')
         lines.append("")
@@ -483,15 +503,10 @@ def _emit_env_var_removes(ctx: BuildContext, lines: List[str]) -> None:
 
         if env.append and env.name.upper() == "PATH":
             env_value = ctx.resolve(env.value)
-            lines.extend([
-                f"  ; Remove PATH entry: {env_value}",
-                f'  ReadRegStr $0 {hive} "{key}" "{env.name}"',
-                f'  StrCpy $1 "{env_value}"',
-                "  Call un._RemovePathEntry",
-                f'  WriteRegExpandStr {hive} "{key}" "{env.name}" "$0"',
-                '  SendMessage ${HWND_BROADCAST} ${WM_SETTINGCHANGE} 0 "STR:Environment" /TIMEOUT=500',
-                "",
-            ])
+            lines.append(_ENV_PATH_REMOVE_TMPL % {
+                'hive': hive, 'key': key, 'name': env.name, 'value': env_value,
+            })
+            lines.append("")
         else:
             lines.append(f'  DeleteRegValue {hive} "{key}" "{env.name}"')
 
@@ -501,7 +516,14 @@ def collect_all_shortcuts(ctx: BuildContext) -> List[ShortcutEntry]:
 
     The index determines the NSIS variable name ($CREATE_SC_<index>) and the
     checkbox control variable ($_SC_CTRL_<index>) used on the shortcut options page.
+
+    Cached on the build context like :func:`get_flat_packages` — the
+    installer and uninstaller sections each enumerate shortcuts more than
+    once, and the config is immutable during emission.
     """
+    cached = getattr(ctx, "_all_shortcuts", None)
+    if cached is not None:
+        return cached
     cfg = ctx.config
     entries: List[ShortcutEntry] = []
     idx = 0
@@ -512,7 +534,17 @@ def collect_all_shortcuts(ctx: BuildContext) -> List[ShortcutEntry]:
             return
         name = ctx.resolve(sc_cfg.name) if sc_cfg.name else "${APP_NAME}"
         sc_type = _shortcut_kind(sc_cfg.location)
-        entries.append(ShortcutEntry(idx, sc_type, sc_cfg, section, name))
+        # Resolve and escape everything the emitters will need in one
+        # place; the install and uninstall passes then just read fields.
+        base_dir = _shortcut_base_dir(ctx, sc_type, sc_cfg.location)
+        link_path = base_dir.rstrip("\\") + f"\\{name}.lnk"
+        entries.append(ShortcutEntry(
+            idx, sc_type, sc_cfg, section, name,
+            _escape_nsis(base_dir), _escape_nsis(link_path),
+            _escape_nsis(_resolve_shortcut_path(ctx, sc_cfg.target)),
+            _escape_nsis(ctx.resolve(sc_cfg.args)) if sc_cfg.args else "",
+            _escape_nsis(_resolve_shortcut_path(ctx, sc_cfg.icon)) if sc_cfg.icon else "",
+        ))
         idx += 1
 
     # Global install shortcuts (legacy)
@@ -528,7 +560,7 @@ def collect_all_shortcuts(ctx: BuildContext) -> List[ShortcutEntry]:
         _append(sc, "global")
 
     # Per-package shortcuts (ordered by _flatten_packages)
-    flat = _flatten_packages(cfg.packages)
+    flat = get_flat_packages(ctx)
     for pkg_idx, pkg in enumerate(flat):
         sec_name = f"SEC_PKG_{pkg_idx}"
         if pkg.desktop_shortcut and pkg.desktop_shortcut.target:
@@ -540,6 +572,7 @@ def collect_all_shortcuts(ctx: BuildContext) -> List[ShortcutEntry]:
         for sc in pkg.shortcuts:
             _append(sc, sec_name)
 
+    ctx._all_shortcuts = entries
     return entries
 
 
@@ -548,15 +581,10 @@ def _emit_single_shortcut(ctx: BuildContext, lines: List[str],
                           add_uninstaller_link: bool = False) -> None:
     """Emit conditional CreateShortCut for a single shortcut, guarded by $CREATE_SC_<index>."""
     i = sc.idx
-    target = _escape_nsis(_resolve_shortcut_path(ctx, sc.config.target))
     name = sc.resolved_name
-    link_path = _escape_nsis(_shortcut_link_path(ctx, sc))
-    base_dir = _escape_nsis(_shortcut_base_dir(ctx, sc))
-    args = _escape_nsis(ctx.resolve(sc.config.args)) if sc.config.args else ""
-    icon = _resolve_shortcut_path(ctx, sc.config.icon) if sc.config.icon else ""
-    icon = _escape_nsis(icon) if icon else ""
-    workdir = _resolve_shortcut_path(ctx, sc.config.workdir) if sc.config.workdir else ""
-    workdir = _escape_nsis(workdir) if workdir else ""
+    target, args, icon = sc.target, sc.args, sc.icon
+    link_path = sc.link_path
+    base_dir = sc.base_dir
 
     create_dir = "" if base_dir in ("$DESKTOP", "$QUICKLAUNCH") else f'  CreateDirectory "{base_dir}"'
     # NOTE: NSIS CreateShortCut does not support specifying a working directory.
@@ -565,13 +593,13 @@ def _emit_single_shortcut(ctx: BuildContext, lines: List[str],
         workdir_raw = ctx.resolve(sc.config.workdir)
         lines.append(f'  ; WARNING: requested workdir "{workdir_raw}" cannot be set by CreateShortCut and will be ignored')
     if args or icon:
-        args_part = f'"{args}"' if args else '""'
-        icon_part = f'"{icon}"' if icon else '""'
-        # Use icon index 0 when icon is provided, otherwise omit
+        # Build the optional tail as parts and join once; f'"{args}"'
+        # yields '""' for a missing argument. Icon index 0 is used
+        # whenever an icon is provided.
+        parts = [f'  CreateShortCut "{link_path}" "{target}"', f'"{args}"']
         if icon:
-            create_line = f'  CreateShortCut "{link_path}" "{target}" {args_part} {icon_part} 0'
-        else:
-            create_line = f'  CreateShortCut "{link_path}" "{target}" {args_part}'
+            parts.append(f'"{icon}" 0')
+        create_line = " ".join(parts)
     else:
         create_line = f'  CreateShortCut "{link_path}" "{target}"'
 
@@ -592,12 +620,24 @@ def _emit_single_shortcut(ctx: BuildContext, lines: List[str],
     lines.append("")
 
 
+def _shortcuts_by_section(ctx: BuildContext) -> dict:
+    """Shortcut entries grouped by owning section, cached on the context.
+
+    Per-section emission would otherwise rescan the full entry list once
+    per package section.
+    """
+    grouped = getattr(ctx, "_sc_by_section", None)
+    if grouped is None:
+        grouped = {}
+        for sc in collect_all_shortcuts(ctx):
+            grouped.setdefault(sc.section, []).append(sc)
+        ctx._sc_by_section = grouped
+    return grouped
+
+
 def _emit_shortcuts(ctx: BuildContext, lines: List[str]) -> None:
     """Emit CreateShortCut for global desktop and start menu shortcuts."""
-    all_sc = collect_all_shortcuts(ctx)
-    for sc in all_sc:
-        if sc.section != "global":
-            continue
+    for sc in _shortcuts_by_section(ctx).get("global", ()):
         # Add Uninstall.lnk only for global start menu shortcuts
         _emit_single_shortcut(ctx, lines, sc,
                               add_uninstaller_link=(sc.sc_type == "startmenu"))
@@ -608,18 +648,17 @@ def _emit_shortcut_removes(ctx: BuildContext, lines: List[str]) -> None:
     if not all_sc:
         return
     lines.append("  ; Remove shortcuts")
-    remove_dirs = set()
-    remove_uninstall = set()
-    for sc in all_sc:
-        link_path = _escape_nsis(_shortcut_link_path(ctx, sc))
-        lines.append(f'  Delete "{link_path}"')
-        if sc.sc_type == "startmenu" and sc.section == "global":
-            base_dir = _escape_nsis(_shortcut_base_dir(ctx, sc))
-            remove_uninstall.add(base_dir)
-            remove_dirs.add(base_dir)
-    for base_dir in sorted(remove_uninstall):
+    # Shortcuts in different sections can resolve to the same .lnk;
+    # dict.fromkeys dedupes the Delete lines in first-seen order.
+    link_paths = dict.fromkeys(sc.link_path for sc in all_sc)
+    lines.extend('  Delete "%s"' % p for p in link_paths)
+    # Global start-menu directories get Uninstall.lnk cleanup and an RMDir;
+    # the same ordered-dedup keeps first-seen order for both loops.
+    sm_dirs = dict.fromkeys(sc.base_dir for sc in all_sc
+                            if sc.sc_type == "startmenu" and sc.section == "global")
+    for base_dir in sm_dirs:
         lines.append(f'  Delete "{base_dir}\\Uninstall.lnk"')
-    for base_dir in sorted(remove_dirs):
+    for base_dir in sm_dirs:
         lines.append(f'  RMDir "{base_dir}"')
     lines.append("")
 
@@ -678,15 +717,32 @@ def _fa_hive_prefix(fa) -> tuple[str, str]:
 
 
 def _flatten_packages(packages) -> list:
+    # Iterative DFS: one result list, no per-level recursion or
+    # intermediate lists for deep package trees.
     flat = []
-    for pkg in packages:
+    stack = list(reversed(packages))
+    while stack:
+        pkg = stack.pop()
         if pkg.children:
-            flat.extend(_flatten_packages(pkg.children))
+            stack.extend(reversed(pkg.children))
         else:
             flat.append(pkg)
     return flat
 
 
+def get_flat_packages(ctx: BuildContext) -> list:
+    """Return the flattened package list, cached on the build context.
+
+    Several generators walk the package tree with the same flattening;
+    the config is immutable during emission, so the walk only needs to
+    happen once per build.
+    """
+    flat = getattr(ctx, "_flat_packages", None)
+    if flat is None:
+        flat = ctx._flat_packages = _flatten_packages(ctx.config.packages)
+    return flat
+
+
 # -----------------------------------------------------------------------
 # Per-package helper variants (accept explicit data lists)
 # -----------------------------------------------------------------------
@@ -697,25 +753,21 @@ def _emit_registry_writes_for(ctx: BuildContext, lines: List[str],
     if not entries:
         return
     lines.append("  ; Registry entries")
-    current_view: Optional[str] = None
-    for entry in entries:
-        key = ctx.resolve(entry.key)
-        value = ctx.resolve(entry.value)
-        target_view = entry.view if entry.view in ("32", "64") else None
-        if target_view != current_view:
-            if current_view is not None:
-                lines.append("  SetRegView lastused")
-            if target_view is not None:
-                lines.append(f"  SetRegView {target_view}")
-            current_view = target_view
-        if entry.type == "dword":
-            lines.append(f'  WriteRegDWORD {entry.hive} "{key}" "{entry.name}" {value}')
-        elif entry.type == "expand":
-            lines.append(f'  WriteRegExpandStr {entry.hive} "{key}" "{entry.name}" "{value}"')
-        else:
-            lines.append(f'  WriteRegStr {entry.hive} "{key}" "{entry.name}" "{value}"')
-    if current_view is not None:
-        lines.append("  SetRegView lastused")
+    resolve = ctx.resolve
+    for view, group in _entries_by_view(entries):
+        if view is not None:
+            lines.append(f"  SetRegView {view}")
+        for entry in group:
+            key = resolve(entry.key)
+            value = resolve(entry.value)
+            if entry.type == "dword":
+                lines.append(_WRD % (entry.hive, key, entry.name, value))
+            elif entry.type == "expand":
+                lines.append(_WRE % (entry.hive, key, entry.name, value))
+            else:
+                lines.append(_WRS % (entry.hive, key, entry.name, value))
+        if view is not None:
+            lines.append("  SetRegView lastused")
     lines.append("")
 
 
@@ -728,28 +780,9 @@ def _emit_env_var_writes_for(ctx: BuildContext, lines: List[str],
         lines.append(f"  ; Environment variable: {env.name} ({env.scope})")
 
         if env.append and env.name.upper() == "PATH":
-            lines.extend([
-                f'  ReadRegStr $0 {hive} "{key}" "{env.name}"',
-                f'  StrCpy $1 "{env_value}"',
-                "",
-                '  ; Check whether the entry already exists',
-                '  Push $0',
-                '  Push $1',
-                "  Call _StrContains",
-                '  StrCmp $R9 "1" _skip_path_append',
-                "",
-                '  ; Append entry',
-                '  StrCmp $0 "" 0 +2',
-                f'    StrCpy $0 "{env_value}"',
-                '  Goto +2',
-                f'    StrCpy $0 "$0;{env_value}"',
-                f'  WriteRegExpandStr {hive} "{key}" "{env.name}" "$0"',
-                "",
-                '  ; Broadcast WM_SETTINGCHANGE',
-                '  SendMessage ${HWND_BROADCAST} ${WM_SETTINGCHANGE} 0 "STR:Environment" /TIMEOUT=500',
-                "",
-                "_skip_path_append:",
-            ])
+            lines.append(_ENV_PATH_APPEND_TMPL % {
+                'hive': hive, 'key': key, 'name': env.name, 'value': env_value,
+            })
         else:
             lines.append(f'  WriteRegStr {hive} "{key}" "{env.name}" "{env_value}"')
         lines.append("")
@@ -762,10 +795,8 @@ def _emit_shortcuts_for(ctx: BuildContext, lines: List[str],
     Uses ``collect_all_shortcuts`` to find the correct per-shortcut
     variable ($CREATE_SC_<i>) for each shortcut in this package.
     """
-    all_sc = collect_all_shortcuts(ctx)
-    for sc in all_sc:
-        if sc.section == section_id:
-            _emit_single_shortcut(ctx, lines, sc, add_uninstaller_link=False)
+    for sc in _shortcuts_by_section(ctx).get(section_id, ()):
+        _emit_single_shortcut(ctx, lines, sc, add_uninstaller_link=False)
 
 
 def _emit_file_associations_for(ctx: BuildContext, lines: List[str],
@@ -773,20 +804,40 @@ def _emit_file_associations_for(ctx: BuildContext, lines: List[str],
     """Emit WriteRegStr for a list of file associations."""
     if not fa_list:
         return
+    # Associations frequently share a description (e.g. several
+    # extensions of one document type); resolve and escape each distinct
+    # string once.
+    desc_cache: dict = {}
+    # Bound once outside the loop: attribute lookups on ctx/LangText/lines
+    # repeat per association otherwise.
+    resolve = ctx.resolve
+    from_value = LangText.from_value
+    extend = lines.extend
     for idx, fa in enumerate(fa_list):
         hive, prefix = _fa_hive_prefix(fa)
-        lines.append(f"  ; File association: {fa.extension} -> {fa.application}")
-        lines.append(f'  WriteRegStr {hive} "{prefix}{fa.extension}" "" "{fa.prog_id}"')
+        # The ProgID subkey prefix recurs in every line below (and once
+        # per verb); concatenate it a single time.
+        base = f"{prefix}{fa.prog_id}"
+        chunk = [_FA_HEAD % (fa.extension, fa.application,
+                             hive, prefix, fa.extension, fa.prog_id)]
         if fa.prog_id:
-            desc_text = LangText.from_value(fa.description)
-            desc_value = ctx.resolve(desc_text.text).replace('"', '$\\"') if desc_text.text else ""
-            lines.append(f'  WriteRegStr {hive} "{prefix}{fa.prog_id}" "" "{desc_value}"')
+            raw = fa.description
+            if isinstance(raw, str):
+                desc_value = desc_cache.get(raw)
+                if desc_value is None:
+                    desc_value = resolve(raw).replace('"', '$\\"') if raw else ""
+                    desc_cache[raw] = desc_value
+            else:
+                desc_text = from_value(raw)
+                desc_value = resolve(desc_text.text).replace('"', '$\\"') if desc_text.text else ""
+            chunk.append(f'  WriteRegStr {hive} "{base}" "" "{desc_value}"')
         if fa.default_icon:
-            lines.append(f'  WriteRegStr {hive} "{prefix}{fa.prog_id}\\DefaultIcon" "" "{fa.default_icon}"')
+            chunk.append(f'  WriteRegStr {hive} "{base}\\DefaultIcon" "" "{fa.default_icon}"')
         verbs = fa.verbs or {}
         if verbs:
             for verb, cmd in verbs.items():
-                lines.append(f'  WriteRegStr {hive} "{prefix}{fa.prog_id}\\Shell\\{verb}\\Command" "" "{cmd}"')
+                chunk.append(f'  WriteRegStr {hive} "{base}\\Shell\\{verb}\\Command" "" "{cmd}"')
         elif fa.application:
-            lines.append(f'  WriteRegStr {hive} "{prefix}{fa.prog_id}\\Shell\\Open\\Command" "" "{fa.application} \\"%1\\""')
-        lines.append("")
+            chunk.append(f'  WriteRegStr {hive} "{base}\\Shell\\Open\\Command" "" "{fa.application} \\"%1\\""')
+        chunk.append("")
+        extend(chunk)
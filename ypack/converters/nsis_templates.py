@@ -0,0 +1,416 @@
+"""
+Static NSIS text blocks and %-style templates used by the emitters.
+
+All fixed NSI fragments live in this one module so the emitted text can
+be grepped and edited in a single place; the emitter modules import the
+constants and interpolate the handful of dynamic fields. %-style
+placeholders are used because the NSIS text itself is full of ${...}
+and $VAR tokens.
+"""
+
+from __future__ import annotations
+
+# ---------------------------------------------------------------------------
+# Existing-install check
+# ---------------------------------------------------------------------------
+
+# Version probe: derive the installed version from Uninstall.exe, falling
+# back to the numeric file version. Static apart from the `_ei` / `_eid`
+# label prefix (install-time check vs. directory-page callback).
+_EI_VERSION_PROBE_TMPL = """\
+  StrCmp $R2 "" 0 %(lbl)s_ver_done
+  ; Fallback: use numeric file version (VS_FIXEDFILEINFO)
+  StrCpy $R6 "FileVersionFixed"
+  GetDLLVersion "$R1\\Uninstall.exe" $0 $1
+  StrCmp $0 0 +2 0
+  Goto +3
+  StrCmp $1 0 +2 0
+  Goto +1
+  StrCpy $R2 ""
+  IntOp $2 $0 >> 16
+  IntOp $3 $0 & 0xFFFF
+  IntOp $4 $1 >> 16
+  IntOp $5 $1 & 0xFFFF
+  StrCpy $R2 "$2.$3.$4.$5"
+  StrCmp $R2 "0.0.0.0" 0 +2
+    StrCpy $R2 ""
+%(lbl)s_ver_done:"""
+
+# Timed wait-for-uninstaller loop (default behaviour). The existence
+# check runs BEFORE the first Sleep so an uninstaller that already
+# finished (the common case — ExecWait is synchronous unless the
+# uninstaller respawns itself) costs zero wait time.
+_EI_WAIT_TIMED_TMPL = """\
+  ExecWait '$R1\\Uninstall.exe %(uninst_args)s' $R4
+  StrCmp $R4 "0" _ei_done
+  ; Wait for uninstaller to finish (up to %(wait_ms)sms)
+  StrCpy $R3 0
+_ei_wait_loop:
+  ; Early exit: no sleep at all once the uninstaller is gone
+  IfFileExists "$R1\\Uninstall.exe" 0 _ei_wait_done
+  ; Loop: if $R3 >= %(wait_ms)s goto _ei_wait_done, else continue waiting
+  IntCmp $R3 %(wait_ms)s _ei_wait_done _ei_wait_done _ei_wait_continue
+_ei_wait_continue:
+  Sleep 500
+  IntOp $R3 $R3 + 500
+  Goto _ei_wait_loop
+_ei_wait_done:
+  ; Verify uninstaller is gone
+  IfFileExists "$R1\\Uninstall.exe" 0 _ei_done"""
+
+# Infinite wait-for-uninstaller loop (uninstall_wait_ms < 0).
+_EI_WAIT_INFINITE_TMPL = """\
+  ExecWait '$R1\\Uninstall.exe %(uninst_args)s' $R4
+  ; Wait for uninstaller to finish (no timeout)
+  StrCpy $R3 0
+_ei_wait_loop:
+  ; Early exit: no sleep at all once the uninstaller is gone
+  IfFileExists "$R1\\Uninstall.exe" 0 _ei_wait_done
+  Sleep 500
+  IntOp $R3 $R3 + 500
+  Goto _ei_wait_loop
+_ei_wait_done:
+  ; Verify uninstaller is gone
+  IfFileExists "$R1\\Uninstall.exe" 0 _ei_done"""
+
+# Debug-log macro (and its disabled stub): written to $TEMP so it works
+# before $INSTDIR exists, e.g. from .onInit.
+_DEBUG_LOG_MACRO = """\
+
+  ; ------------------------------------------------------------------
+  ; Early debug log macro (independent from install log; works in .onInit)
+  ; Writes to: $TEMP\\ypack-debug.log
+  ; Implemented as !macro to avoid nested-function stack conflicts.
+  ; The file handle is opened lazily on first use and then kept open:
+  ; one open/seek for the whole run instead of an open/seek/close per
+  ; line. The handle is reclaimed at process exit; FileWrite goes
+  ; through the OS cache, so no data is lost by skipping FileClose.
+  ; Uses $R7 (high register) to avoid conflicts with main code.
+  ; ------------------------------------------------------------------
+Var _YPACK_LogHandle
+
+!macro _YPACK_DebugLog _msg
+  IntCmp $_YPACK_LogHandle 0 0 +3 +3
+  FileOpen $_YPACK_LogHandle "$TEMP\\ypack-debug.log" a
+  FileSeek $_YPACK_LogHandle 0 END
+  IntCmp $_YPACK_LogHandle 0 +5 0 0
+  Push $R7
+  StrCpy $R7 `${_msg}`
+  FileWrite $_YPACK_LogHandle "$R7$\\r$\\n"
+  Pop $R7
+!macroend
+"""
+
+_DEBUG_LOG_STUB = """\
+
+  ; ------------------------------------------------------------------
+  ; Debug log macro stub (logging disabled)
+  ; ------------------------------------------------------------------
+!macro _YPACK_DebugLog _msg
+  ; (logging disabled)
+!macroend
+"""
+
+# _YPACK_GetFileProductVersion: fully static WinAPI version probe.
+_VERINFO_FUNC = """\
+
+  ; ------------------------------------------------------------------
+  ; VersionInfo helper: read ProductVersion from a file (WinAPI)
+  ; The result is cached per file path: the directory page can be left
+  ; multiple times and the WinAPI dance (GetFileVersionInfoW + alloc +
+  ; VerQueryValueW probing) is pure waste on re-entry.
+  ; ------------------------------------------------------------------
+Var _YPACK_CachedProdVer      ; memoised result of the last lookup
+Var _YPACK_CachedProdVerPath  ; file path the cached result belongs to
+
+Function _YPACK_GetFileProductVersion
+  Exch $0  ; file path
+  StrCmp $0 $_YPACK_CachedProdVerPath 0 _ypack_ver_fresh
+  !insertmacro _YPACK_DebugLog "[YPACK] VerInfo: cached ProductVersion for: $0"
+  StrCpy $9 $_YPACK_CachedProdVer
+  Exch $9
+  Return
+_ypack_ver_fresh:
+  Push $1
+  Push $2
+  Push $3
+  Push $4
+  Push $5
+  Push $6
+  Push $7
+  Push $8
+  StrCpy $9 ""
+  !insertmacro _YPACK_DebugLog "[YPACK] VerInfo: reading ProductVersion from: $0"
+  ; DWORD GetFileVersionInfoSizeW(LPCWSTR lptstrFilename, LPDWORD lpdwHandle);
+  System::Call 'version::GetFileVersionInfoSizeW(w r0, *i .r1) i .r2'
+  !insertmacro _YPACK_DebugLog "[YPACK] VerInfo: GetFileVersionInfoSizeW -> size=$2"
+  StrCmp $2 0 _ypack_ver_done
+  System::Alloc $2
+  Pop $3
+  !insertmacro _YPACK_DebugLog "[YPACK] VerInfo: Alloc -> ptr=$3"
+  StrCmp $3 0 _ypack_ver_done
+  ; BOOL GetFileVersionInfoW(LPCWSTR, DWORD, DWORD, LPVOID);
+  System::Call 'version::GetFileVersionInfoW(w r0, i 0, i r2, i r3) i .r4'
+  !insertmacro _YPACK_DebugLog "[YPACK] VerInfo: GetFileVersionInfoW -> ok=$4"
+  StrCmp $4 0 _ypack_ver_free
+  ; BOOL VerQueryValueW(LPCVOID, LPCWSTR, LPVOID*, PUINT);
+  System::Call 'version::VerQueryValueW(i r3, w "\\VarFileInfo\\Translation", *p .r5, *i .r6) i .r7'
+  !insertmacro _YPACK_DebugLog "[YPACK] VerInfo: Translation query -> ok=$7 ptr=$5 len=$6"
+  StrCmp $7 0 _ypack_ver_try1
+  ; Read first LANGANDCODEPAGE as a DWORD (low WORD=lang, high WORD=codepage)
+  System::Call "*$5(&i .r8)"
+  IntOp $6 $8 & 0xFFFF
+  IntOp $7 $8 >> 16
+  IntFmt $1 "%04X" $6
+  IntFmt $2 "%04X" $7
+  StrCpy $1 "$1$2"
+  ; If Translation returned 0x00000000, skip it and use common fallbacks
+  StrCmp $1 "00000000" _ypack_ver_try1
+  ; The query attempts below are unrolled straight-line: each langcp is
+  ; tried once (ProductVersion, then FileVersion) and falls through to
+  ; the next attempt on failure. This replaces the old StrCmp/Goto
+  ; cycle through _ypack_ver_query, which cost two comparisons and two
+  ; jumps per miss and gave up without trying the fallbacks when the
+  ; file's own langcp was not one of the hardcoded values.
+  ; Attempt 0: langcp from the file's own Translation table
+  StrCpy $2 "\\StringFileInfo\\$1\\ProductVersion"
+  !insertmacro _YPACK_DebugLog "[YPACK] VerInfo: Query ProductVersion with langcp=$1"
+  System::Call 'version::VerQueryValueW(i r3, w r2, *p .r5, *i .r6) i .r7'
+  StrCmp $7 0 _ypack_ver_try1
+  System::Call "*$5(&t${NSIS_MAX_STRLEN} .r9)"
+  !insertmacro _YPACK_DebugLog "[YPACK] VerInfo: ProductVersion=$9"
+  StrCmp $9 "" 0 _ypack_ver_ok
+  ; ProductVersion missing: try FileVersion string key
+  StrCpy $2 "\\StringFileInfo\\$1\\FileVersion"
+  System::Call 'version::VerQueryValueW(i r3, w r2, *p .r5, *i .r6) i .r7'
+  StrCmp $7 0 _ypack_ver_try1
+  System::Call "*$5(&t${NSIS_MAX_STRLEN} .r9)"
+  StrCmp $9 "" _ypack_ver_try1 _ypack_ver_ok
+_ypack_ver_try1:
+  ; Attempt 1: 0409/04B0 (English/Unicode), most common for installers
+  StrCpy $1 "040904B0"
+  StrCpy $2 "\\StringFileInfo\\$1\\ProductVersion"
+  !insertmacro _YPACK_DebugLog "[YPACK] VerInfo: Query ProductVersion with langcp=$1"
+  System::Call 'version::VerQueryValueW(i r3, w r2, *p .r5, *i .r6) i .r7'
+  StrCmp $7 0 _ypack_ver_try2
+  System::Call "*$5(&t${NSIS_MAX_STRLEN} .r9)"
+  !insertmacro _YPACK_DebugLog "[YPACK] VerInfo: ProductVersion=$9"
+  StrCmp $9 "" 0 _ypack_ver_ok
+  ; ProductVersion missing: try FileVersion string key
+  StrCpy $2 "\\StringFileInfo\\$1\\FileVersion"
+  System::Call 'version::VerQueryValueW(i r3, w r2, *p .r5, *i .r6) i .r7'
+  StrCmp $7 0 _ypack_ver_try2
+  System::Call "*$5(&t${NSIS_MAX_STRLEN} .r9)"
+  StrCmp $9 "" _ypack_ver_try2 _ypack_ver_ok
+_ypack_ver_try2:
+  ; Attempt 2: 0804/04B0 (Simplified Chinese/Unicode)
+  StrCpy $1 "080404B0"
+  StrCpy $2 "\\StringFileInfo\\$1\\ProductVersion"
+  !insertmacro _YPACK_DebugLog "[YPACK] VerInfo: Query ProductVersion with langcp=$1"
+  System::Call 'version::VerQueryValueW(i r3, w r2, *p .r5, *i .r6) i .r7'
+  StrCmp $7 0 _ypack_ver_try3
+  System::Call "*$5(&t${NSIS_MAX_STRLEN} .r9)"
+  !insertmacro _YPACK_DebugLog "[YPACK] VerInfo: ProductVersion=$9"
+  StrCmp $9 "" 0 _ypack_ver_ok
+  ; ProductVersion missing: try FileVersion string key
+  StrCpy $2 "\\StringFileInfo\\$1\\FileVersion"
+  System::Call 'version::VerQueryValueW(i r3, w r2, *p .r5, *i .r6) i .r7'
+  StrCmp $7 0 _ypack_ver_try3
+  System::Call "*$5(&t${NSIS_MAX_STRLEN} .r9)"
+  StrCmp $9 "" _ypack_ver_try3 _ypack_ver_ok
+_ypack_ver_try3:
+  ; Attempt 3: 0000/04B0 (language-neutral/Unicode), then give up
+  StrCpy $1 "000004B0"
+  StrCpy $2 "\\StringFileInfo\\$1\\ProductVersion"
+  !insertmacro _YPACK_DebugLog "[YPACK] VerInfo: Query ProductVersion with langcp=$1"
+  System::Call 'version::VerQueryValueW(i r3, w r2, *p .r5, *i .r6) i .r7'
+  StrCmp $7 0 _ypack_ver_free
+  System::Call "*$5(&t${NSIS_MAX_STRLEN} .r9)"
+  !insertmacro _YPACK_DebugLog "[YPACK] VerInfo: ProductVersion=$9"
+  StrCmp $9 "" 0 _ypack_ver_ok
+  ; ProductVersion missing: try FileVersion string key
+  StrCpy $2 "\\StringFileInfo\\$1\\FileVersion"
+  System::Call 'version::VerQueryValueW(i r3, w r2, *p .r5, *i .r6) i .r7'
+  StrCmp $7 0 _ypack_ver_free
+  System::Call "*$5(&t${NSIS_MAX_STRLEN} .r9)"
+  Goto _ypack_ver_ok
+_ypack_ver_ok:
+  ; $9 now contains ProductVersion/FileVersion (or empty)
+  StrCpy $9 $9
+_ypack_ver_free:
+  StrCmp $3 0 _ypack_ver_done
+  System::Free $3
+_ypack_ver_done:
+  Pop $8
+  Pop $7
+  Pop $6
+  Pop $5
+  Pop $4
+  Pop $3
+  Pop $2
+  Pop $1
+  StrCpy $_YPACK_CachedProdVerPath $0
+  StrCpy $_YPACK_CachedProdVer $9
+  Exch $9
+FunctionEnd
+"""
+
+# Deferred-detection note emitted in .onInit when allow_multiple is set.
+_EI_DEFERRED_NOTE = """\
+
+  ; ------------------------------------------------------------------
+  ; Existing-install detection (deferred to directory page because allow_multiple=true)
+  ; ------------------------------------------------------------------
+  ; NOTE: Actual path collision detection will run in Function ExistingInstall_DirLeave"""
+
+# Fixed header of the .onInit existing-install check; only the registry
+# view varies.
+_EI_HEADER_TMPL = """\
+
+  ; ------------------------------------------------------------------
+  ; Existing-install detection
+  ; ------------------------------------------------------------------
+  SetRegView %(reg_view)s
+  ReadRegStr $R0 HKLM "${REG_KEY}" "InstallPath"
+  StrCmp $R0 "" _ei_done  ; No previous install registered
+  StrCpy $R1 $R0
+  IfFileExists "$R1\\Uninstall.exe" _ei_has_uninst _ei_overwrite_only
+_ei_has_uninst:"""
+
+# un.onInit is fully static apart from the optional LogSet block.
+_UNINIT_LOG_BLOCK = """\
+
+!ifdef NSIS_CONFIG_LOG
+  LogSet on
+!endif"""
+
+_UNINIT_TMPL = """\
+; ===========================================================================
+; Uninstaller Initialization
+; ===========================================================================
+Function un.onInit
+
+  ; Prevent multiple uninstaller instances
+  System::Call 'kernel32::CreateMutex(p 0, i 0, t "${APP_NAME}_UninstallerMutex") p .r1 ?e'
+  Pop $R0
+  StrCmp $R0 "0" +3 0
+  MessageBox MB_OK|MB_ICONEXCLAMATION "The uninstaller is already running."
+  Abort
+%(log_block)s
+FunctionEnd
+"""
+
+# Signing / update blocks are fixed text with a handful of interpolated
+# fields; a single %-format over a module constant replaces a dozen
+# per-build f-string allocations. (%%1 below is a literal signtool "%1".)
+_SIGNING_TMPL = """\
+; --- Code Signing ---
+; Certificate: %(cert)s
+; Timestamp:   %(ts)s
+; Verify after build: %(verify)s
+; Checksum: %(cs_type)s %(cs_value)s
+!finalize 'signtool sign /f "%(cert)s" /p "%(password)s" /t "%(ts)s" "%%1"'
+"""
+
+_UPDATE_TMPL = """\
+; --- Auto-Update Configuration ---
+!define UPDATE_URL "%(update_url)s"
+!define DOWNLOAD_URL "%(download_url)s"
+!define CHECK_ON_STARTUP "%(check)s"
+!define BACKUP_ON_UPGRADE "%(backup)s"
+!define REPAIR_ENABLED "%(repair)s"
+
+Section "Update Configuration"
+  WriteRegStr %(hive)s "%(key)s" "UpdateURL" "${UPDATE_URL}"
+  WriteRegStr %(hive)s "%(key)s" "DownloadURL" "${DOWNLOAD_URL}"
+  WriteRegStr %(hive)s "%(key)s" "CheckOnStartup" "${CHECK_ON_STARTUP}"
+  WriteRegStr %(hive)s "%(key)s" "BackupOnUpgrade" "${BACKUP_ON_UPGRADE}"
+  WriteRegStr %(hive)s "%(key)s" "RepairEnabled" "${REPAIR_ENABLED}"
+SectionEnd
+"""
+
+# ---------------------------------------------------------------------------
+# Install section
+# ---------------------------------------------------------------------------
+
+# Uninstaller write: fully static.
+_UNINST_WRITE_BLOCK = """\
+  ; Write uninstaller
+  SetOutPath $INSTDIR
+  WriteUninstaller "$INSTDIR\\Uninstall.exe"
+"""
+
+# InstallPath/Version + Add/Remove Programs registry block; only the
+# registry view varies.
+# Add/Remove Programs helpers. The shared Uninstall subkey is defined once
+# and every ARP value goes through one of the two macros, so the long key
+# path appears a single time in the emitted script.
+_ARP_MACROS_BLOCK = """\
+!define ARP_KEY "Software\\Microsoft\\Windows\\CurrentVersion\\Uninstall\\${APP_NAME}"
+!macro ARP_WRITE_STR _name _value
+  WriteRegStr HKLM "${ARP_KEY}" "${_name}" "${_value}"
+!macroend
+!macro ARP_WRITE_DWORD _name _value
+  WriteRegDWORD HKLM "${ARP_KEY}" "${_name}" ${_value}
+!macroend"""
+
+_ARP_REG_TMPL = """\
+  ; Application registry entries (using %(reg_view)s-bit registry view)
+  SetRegView %(reg_view)s
+  WriteRegStr HKLM "${REG_KEY}" "InstallPath" "$INSTDIR"
+  WriteRegStr HKLM "${REG_KEY}" "Version" "${APP_VERSION}"
+
+  ; Add/Remove Programs (ARP) registry entries
+  !insertmacro ARP_WRITE_STR "DisplayName" "${APP_NAME}"
+  !insertmacro ARP_WRITE_STR "DisplayVersion" "${APP_VERSION}"
+  !insertmacro ARP_WRITE_STR "Publisher" "${APP_PUBLISHER}"
+  !insertmacro ARP_WRITE_STR "UninstallString" "$\\"$INSTDIR\\Uninstall.exe$\\""
+  !insertmacro ARP_WRITE_STR "QuietUninstallString" "$\\"$INSTDIR\\Uninstall.exe$\\" /S"
+  !insertmacro ARP_WRITE_STR "InstallLocation" "$INSTDIR"
+  !insertmacro ARP_WRITE_DWORD "NoModify" 1
+  !insertmacro ARP_WRITE_DWORD "NoRepair" 1
+  !insertmacro ARP_WRITE_STR "DisplayIcon" "$INSTDIR\\Uninstall.exe,0"
+  SetRegView lastused
+"""
+
+# Estimated install size for ARP. (%%08X is a literal IntFmt format.)
+_EST_SIZE_TMPL = """\
+  ; Calculate installed size
+  ${GetSize} "$INSTDIR" "/S=0K" $0 $1 $2
+  IntFmt $0 "0x%%08X" $0
+  SetRegView %(reg_view)s
+  !insertmacro ARP_WRITE_DWORD "EstimatedSize" $0
+  SetRegView lastused
+"""
+
+# PATH-style environment variable handling. The same blocks are emitted
+# for global and per-package env vars; only hive/key/name/value vary.
+_ENV_PATH_APPEND_TMPL = """\
+  ReadRegStr $0 %(hive)s "%(key)s" "%(name)s"
+  StrCpy $1 "%(value)s"
+
+  ; Check whether the entry already exists
+  Push $0
+  Push $1
+  Call _StrContains
+  StrCmp $R9 "1" _skip_path_append
+
+  ; Append entry
+  StrCmp $0 "" 0 +2
+    StrCpy $0 "%(value)s"
+  Goto +2
+    StrCpy $0 "$0;%(value)s"
+  WriteRegExpandStr %(hive)s "%(key)s" "%(name)s" "$0"
+
+  ; Broadcast WM_SETTINGCHANGE
+  SendMessage ${HWND_BROADCAST} ${WM_SETTINGCHANGE} 0 "STR:Environment" /TIMEOUT=500
+
+_skip_path_append:"""
+
+_ENV_PATH_REMOVE_TMPL = """\
+  ; Remove PATH entry: %(value)s
+  ReadRegStr $0 %(hive)s "%(key)s" "%(name)s"
+  StrCpy $1 "%(value)s"
+  Call un._RemovePathEntry
+  WriteRegExpandStr %(hive)s "%(key)s" "%(name)s" "$0"
+  SendMessage ${HWND_BROADCAST} ${WM_SETTINGCHANGE} 0 "STR:Environment" /TIMEOUT=500"""
@@ -13,8 +13,11 @@ in the corresponding converter module (e.g. ``converters/nsis_languages.py``).
 
 from __future__ import annotations
 
+import sys
 from dataclasses import dataclass
-from typing import Dict, Optional
+from functools import lru_cache
+from types import MappingProxyType
+from typing import Dict, Mapping, Optional
 
 
 @dataclass(frozen=True)
@@ -26,6 +29,10 @@ class LanguageInfo:
     in the converter layer — see ``converters/nsis_languages.py``.
     """
 
+    # Spelled out rather than dataclass(slots=True) because the project
+    # still supports Python 3.8.
+    __slots__ = ("name", "iso_code", "description")
+
     name: str            # ypack canonical name (e.g., "SimplifiedChinese")
     iso_code: str        # ISO 639-1 / BCP 47 tag (e.g., "zh-CN")
     description: str     # Human-readable label (e.g., "Simplified Chinese")
@@ -85,21 +92,14 @@ _reg("Vietnamese",             "vi",     "Vietnamese (Vietnam)")
 # Alias map — maps legacy / shorthand names to canonical ypack names
 # ---------------------------------------------------------------------------
 
-_ALIAS_MAP: Dict[str, str] = {}
-
-
-def _build_alias_map() -> None:
-    """Build the alias map from the language registry."""
-    # Canonical names (case-insensitive lookup)
-    for name in LANGUAGE_REGISTRY:
-        _ALIAS_MAP[name.lower()] = name
-
-    # ISO code aliases
-    for name, info in LANGUAGE_REGISTRY.items():
-        _ALIAS_MAP[info.iso_code.lower()] = name
-
-    # Legacy / shorthand aliases (case-insensitive, stored lowercase)
-    _ALIAS_MAP.update({
+def _build_alias_map() -> Mapping[str, str]:
+    """Build the alias map from the language registry in one dict merge."""
+    return MappingProxyType({
+        # Canonical names (case-insensitive lookup)
+        **{name.lower(): name for name in LANGUAGE_REGISTRY},
+        # ISO code aliases
+        **{info.iso_code.lower(): name for name, info in LANGUAGE_REGISTRY.items()},
+        # Legacy / shorthand aliases (case-insensitive, stored lowercase)
         # Common aliases
         "chinese":              "SimplifiedChinese",
         "zh":                   "SimplifiedChinese",
@@ -130,9 +130,11 @@ def _build_alias_map() -> None:
     })
 
 
-_build_alias_map()
+# Read-only: built exactly once at import; lookups never mutate it.
+_ALIAS_MAP: Mapping[str, str] = _build_alias_map()
 
 
+@lru_cache(maxsize=256)
 def resolve_language_name(name: str) -> str:
     """Resolve a language name (possibly an alias) to the canonical ypack name.
 
@@ -148,6 +150,10 @@ def resolve_language_name(name: str) -> str:
         >>> resolve_language_name("zh-CN")
         'SimplifiedChinese'
     """
+    # Canonical names hit the registry directly, skipping the lower()
+    # allocation for the common already-canonical case.
+    if name in LANGUAGE_REGISTRY:
+        return name
     return _ALIAS_MAP.get(name.lower(), name)
 
 
@@ -157,8 +163,12 @@ def get_language_info(name: str) -> Optional[LanguageInfo]:
     Returns ``None`` if the language is not in the registry (the caller
     should decide how to handle unrecognised languages).
     """
-    canonical = resolve_language_name(name)
-    return LANGUAGE_REGISTRY.get(canonical)
+    # Most callers already pass the canonical name — try the registry
+    # directly before paying for alias resolution.
+    info = LANGUAGE_REGISTRY.get(name)
+    if info is not None:
+        return info
+    return LANGUAGE_REGISTRY.get(resolve_language_name(name))
 
 
 # ---------------------------------------------------------------------------
@@ -185,6 +195,9 @@ BUILTIN_STRING_IDS = (
     "existing_install_abort",
     "existing_install_abort_no_ver",
 )
+# Interned: lookups keyed on these ids hit CPython's identity-compare
+# fast path when callers pass the usual short literals.
+BUILTIN_STRING_IDS = tuple(sys.intern(s) for s in BUILTIN_STRING_IDS)
 
 BUILTIN_TRANSLATIONS = {
     "English": {
@@ -313,13 +326,6 @@ BUILTIN_TRANSLATIONS = {
         "langpage_desc":        "Selecione o idioma do instalador.",
         "finish_run":           "Executar ${APP_NAME}",
     },
-    "BrazilianPortuguese": {
-        "shortcuts_desktop":    "Criar atalho na área de trabalho",
-        "shortcuts_startmenu":  "Criar atalho no menu Iniciar",
-        "langpage_title":       "Escolher idioma de instalação",
-        "langpage_desc":        "Selecione o idioma do instalador.",
-        "finish_run":           "Executar ${APP_NAME}",
-    },
     "Italian": {
         "shortcuts_desktop":    "Crea collegamento sul desktop",
         "shortcuts_startmenu":  "Crea collegamento nel menu Start",
@@ -414,10 +420,41 @@ BUILTIN_TRANSLATIONS = {
     },
 }
 
-# Copy Spanish to SpanishInternational
-BUILTIN_TRANSLATIONS["SpanishInternational"] = BUILTIN_TRANSLATIONS["Spanish"].copy()
-# Copy Norwegian to NorwegianNynorsk
-BUILTIN_TRANSLATIONS["NorwegianNynorsk"] = BUILTIN_TRANSLATIONS["Norwegian"].copy()
+# Variant languages share their parent's table. The dicts are frozen
+# read-only below, so aliasing is safe and skips the per-string copies.
+BUILTIN_TRANSLATIONS["BrazilianPortuguese"] = BUILTIN_TRANSLATIONS["Portuguese"]
+BUILTIN_TRANSLATIONS["SpanishInternational"] = BUILTIN_TRANSLATIONS["Spanish"]
+BUILTIN_TRANSLATIONS["NorwegianNynorsk"] = BUILTIN_TRANSLATIONS["Norwegian"]
+
+# Freeze the per-language tables: nothing mutates them after import, and
+# the read-only wrapper makes that explicit (the hot lookups go through
+# _FLAT_TRANSLATIONS below anyway).
+BUILTIN_TRANSLATIONS = {
+    lang: MappingProxyType(strings)
+    for lang, strings in BUILTIN_TRANSLATIONS.items()
+}
+
+
+def _flatten_translations() -> Dict[tuple, str]:
+    """Flatten BUILTIN_TRANSLATIONS to one dict keyed by (language, id).
+
+    The English fallback is merged into every language up front, so a
+    lookup is a single dict.get instead of the per-call two-level
+    lookup plus fallback chain.
+    """
+    english = BUILTIN_TRANSLATIONS["English"]
+    flat: Dict[tuple, str] = {}
+    for lang, strings in BUILTIN_TRANSLATIONS.items():
+        merged = {**english, **strings}
+        for string_id, text in merged.items():
+            flat[(lang, sys.intern(string_id))] = text
+    return flat
+
+
+_FLAT_TRANSLATIONS: Dict[tuple, str] = _flatten_translations()
+# Direct handle on the English table for the unknown-language fallback —
+# skips the tuple-key build on misses.
+_ENGLISH_TRANSLATIONS = BUILTIN_TRANSLATIONS["English"]
 
 
 def get_translated_string(
@@ -445,12 +482,10 @@ def get_translated_string(
     if user_strings and string_id in user_strings:
         return user_strings[string_id]
 
-    # 2. Built-in translation for this language
-    canonical = resolve_language_name(lang_name)
-    if canonical in BUILTIN_TRANSLATIONS:
-        text = BUILTIN_TRANSLATIONS[canonical].get(string_id)
-        if text is not None:
-            return text
+    # 2. Built-in translation (English fallback pre-merged per language)
+    text = _FLAT_TRANSLATIONS.get((resolve_language_name(lang_name), string_id))
+    if text is not None:
+        return text
 
-    # 3. English fallback
-    return BUILTIN_TRANSLATIONS.get("English", {}).get(string_id, "")
+    # 3. English fallback for languages without a translation table
+    return _ENGLISH_TRANSLATIONS.get(string_id, "")
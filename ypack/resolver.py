@@ -8,7 +8,17 @@ Handles resolution of:
 """
 
 import re
-from typing import Any, Dict, Set, Optional
+from typing import Any, Dict, Optional, Tuple
+
+# Compiled once at import: resolve() runs over every string in the
+# configuration, so the per-call pattern-cache lookup of the string-based
+# re.sub/re.findall forms adds up.
+_CONFIG_REF_RE = re.compile(r'\$\{([^}]+)\}')
+_BUILTIN_VAR_RE = re.compile(r'\$([A-Z_][A-Z0-9_]*)')
+# Fused resolution pattern: the $$ escape, ${...} config references and
+# $VAR builtins are handled in a single scan. $$ must come first in the
+# alternation so an escaped dollar never starts a variable match.
+_RESOLVE_RE = re.compile(r'\$\$|\$\{([^}]+)\}|\$([A-Z_][A-Z0-9_]*)')
 
 
 class CircularReferenceError(Exception):
@@ -30,9 +40,14 @@ class VariableResolver:
         """
         self.config = config_dict
         self.registry = variable_registry
-        self._resolving_stack: Set[str] = set()
+        # Raw values by dot-path. The same few references (app.name,
+        # app.version, ...) recur throughout a config, and a resolver
+        # instance lives for a single run over an unchanging dict, so the
+        # walk only has to happen once per distinct path.
+        self._path_cache: Dict[str, Any] = {}
     
-    def resolve(self, text: str, depth: int = 0) -> str:
+    def resolve(self, text: str, depth: int = 0,
+                in_progress: Tuple[str, ...] = ()) -> str:
         """Resolve all variable references in text.
         
         Resolution order:
@@ -42,6 +57,9 @@ class VariableResolver:
         Args:
             text: Text containing variable references
             depth: Current recursion depth (for cycle detection)
+            in_progress: References currently being resolved, in order
+                (for cycle detection; threaded through recursion so the
+                resolver keeps no mutable state between calls)
             
         Returns:
             Text with all variables resolved
@@ -52,7 +70,13 @@ class VariableResolver:
         """
         if not text or not isinstance(text, str):
             return text
-        
+
+        # Most config strings (paths, labels, messages) contain no
+        # references at all — one substring scan beats two regex passes
+        # plus the $$-escape replace round-trip.
+        if '$' not in text:
+            return text
+
         # Depth protection
         if depth > self.MAX_DEPTH:
             raise RecursionError(
@@ -60,89 +84,41 @@ class VariableResolver:
                 "Possible circular reference or overly complex nesting."
             )
         
-        # Phase 1: Resolve ${...} config references
-        text = self._resolve_config_references(text, depth)
-        
-        # Phase 2: Resolve $VAR built-in variables
-        text = self._resolve_builtin_variables(text)
-        
-        return text
-    
-    def _resolve_config_references(self, text: str, depth: int) -> str:
-        """Resolve ${path.to.value} style references.
-        
-        Args:
-            text: Text containing ${...} references
-            depth: Current recursion depth
-            
-        Returns:
-            Text with ${...} references resolved
-        """
-        pattern = r'\$\{([^}]+)\}'
-        
+        # Single fused pass: one scan of the text handles escapes, config
+        # references and builtins instead of two regex passes plus the
+        # sentinel replace round-trip for $$.
         def replace_match(match):
             ref_path = match.group(1)  # e.g., "app.name" or "variables.DATA_DIR"
-            
-            # Circular reference detection
-            if ref_path in self._resolving_stack:
-                chain = ' → '.join(self._resolving_stack) + f' → {ref_path}'
-                raise CircularReferenceError(
-                    f"Circular reference detected: {chain}"
-                )
-            
-            # Add to resolution stack
-            self._resolving_stack.add(ref_path)
-            try:
-                # Get value from config
+            if ref_path is not None:
+                # Circular reference detection
+                if ref_path in in_progress:
+                    chain = ' → '.join(in_progress) + f' → {ref_path}'
+                    raise CircularReferenceError(
+                        f"Circular reference detected: {chain}"
+                    )
                 value = self._get_value_by_path(ref_path)
                 if value is None:
                     # Reference not found - keep original
                     return match.group(0)
-                
-                # Recursively resolve (value might contain more references)
-                resolved = self.resolve(str(value), depth + 1)
-                return resolved
-            finally:
-                # Remove from stack
-                self._resolving_stack.discard(ref_path)
-        
-        return re.sub(pattern, replace_match, text)
-    
-    def _resolve_builtin_variables(self, text: str) -> str:
-        """Resolve $VAR style built-in variables.
-        
-        Args:
-            text: Text containing $VAR references
-            
-        Returns:
-            Text with $VAR references converted to target tool format
-        """
-        # Match $WORD but not ${...} (already handled)
-        # Also handle escaped $$ → $
-        
-        # First protect escaped $$
-        text = text.replace('$$', '\x00ESCAPED_DOLLAR\x00')
-        
-        # Pattern: $VARNAME where VARNAME is uppercase letters/underscores
-        pattern = r'\$([A-Z_][A-Z0-9_]*)'
-        
-        def replace_match(match):
-            var_name = match.group(1)
+                # Recursively resolve (value might contain more references);
+                # the in-progress chain travels with the call, so there is
+                # no shared stack to unwind on error.
+                return self.resolve(str(value), depth + 1,
+                                    in_progress + (ref_path,))
             
-            # Try to resolve as built-in variable
-            resolved = self.registry.resolve_builtin_var(var_name)
-            if resolved is not None:
-                return resolved
+            var_name = match.group(2)
+            if var_name is not None:
+                # Try to resolve as built-in variable
+                resolved = self.registry.resolve_builtin_var(var_name)
+                if resolved is not None:
+                    return resolved
+                # Unknown variable - keep as-is (caught by validation if strict)
+                return match.group(0)
             
-            # Unknown variable - keep as-is (will be caught by validation if strict)
-            return match.group(0)
-        
-        text = re.sub(pattern, replace_match, text)
-        
-        # Restore escaped dollars
-        text = text.replace('\x00ESCAPED_DOLLAR\x00', '$')
+            # The remaining alternative is the $$ escape.
+            return '$'
         
-        return text
+        return _RESOLVE_RE.sub(replace_match, text)
     
     def _get_value_by_path(self, path: str) -> Optional[Any]:
         """Get a value from config dict using dot-separated path.
@@ -153,14 +129,19 @@ class VariableResolver:
         Returns:
             Value at the path, or None if not found
         """
+        cache = self._path_cache
+        if path in cache:
+            return cache[path]
         obj = self.config
         for key in path.split('.'):
             if isinstance(obj, dict):
                 obj = obj.get(key)
             else:
-                return None
+                obj = None
+                break
             if obj is None:
-                return None
+                break
+        cache[path] = obj
         return obj
     
     def validate_references(self, text: str, strict: bool = False) -> list:
@@ -182,14 +163,14 @@ class VariableResolver:
         unknown = []
         
         # Check ${...} references
-        config_refs = re.findall(r'\$\{([^}]+)\}', text)
+        config_refs = _CONFIG_REF_RE.findall(text)
         for ref_path in config_refs:
             value = self._get_value_by_path(ref_path)
             if value is None:
                 unknown.append(f'${{{ref_path}}}')
         
         # Check $VAR references
-        builtin_refs = re.findall(r'\$([A-Z_][A-Z0-9_]*)', text)
+        builtin_refs = _BUILTIN_VAR_RE.findall(text)
         for var_name in builtin_refs:
             if not self.registry.validate_variable(var_name, strict=False):
                 unknown.append(f'${var_name}')
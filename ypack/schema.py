@@ -152,6 +152,7 @@ CONFIG_SCHEMA: Dict[str, Any] = {
                 "silent_install": _BOOL,
                 "registry_key": _STRING,
                 "registry_view": {"type": "string", "enum": ["auto", "32", "64"], "default": "auto"},
+                "group_by_destination": _BOOL,
                 "existing_install": {
                     "oneOf": [
                         {"type": "string", "enum": ["prompt_uninstall", "auto_uninstall", "overwrite", "abort", "none"]},